@@ -0,0 +1,73 @@
+"""Store certificates DER serialized
+
+Revision ID: 000000000200
+Revises: 000000000100
+Create Date: 2026-10-17 10:12:41.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+
+
+# revision identifiers, used by Alembic.
+revision = '000000000200'
+down_revision = '000000000100'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+cert_entities = sa.table(
+    'cert_entities',
+    sa.column('sn', sa.LargeBinary()),
+    sa.column('der_serialized', sa.LargeBinary()),
+    sa.column('pem_serialized', sa.Text()),
+)
+
+
+def convert(source, target, func):
+    """ Fills column `target` with `func` of column `source` in batches ordered by serial number """
+    connection = op.get_bind()
+    c = cert_entities.c
+    update_stmt = cert_entities.update() \
+        .where(c.sn == sa.bindparam('b_sn')) \
+        .values({target: sa.bindparam('b_value')})
+    last_sn = None
+    while True:
+        select_stmt = sa.select(c.sn, c[source]).order_by(c.sn).limit(BATCH_SIZE)
+        if last_sn is not None:
+            select_stmt = select_stmt.where(c.sn > last_sn)
+        rows = connection.execute(select_stmt).all()
+        if not rows:
+            break
+        connection.execute(update_stmt, [dict(b_sn=sn, b_value=func(value)) for sn, value in rows])
+        last_sn = rows[-1].sn
+
+
+def pem_to_der(pem_serialized: str) -> bytes:
+    cert = x509.load_pem_x509_certificate(pem_serialized.encode('utf8'))
+    return cert.public_bytes(encoding=serialization.Encoding.DER)
+
+
+def der_to_pem(der_serialized: bytes) -> str:
+    cert = x509.load_der_x509_certificate(der_serialized)
+    return cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+
+
+def upgrade() -> None:
+    op.add_column('cert_entities', sa.Column('der_serialized', sa.LargeBinary(), nullable=True))
+    convert('pem_serialized', 'der_serialized', pem_to_der)
+    with op.batch_alter_table('cert_entities') as batch_op:
+        batch_op.alter_column('der_serialized', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.alter_column('pem_serialized', existing_type=sa.Text(), nullable=True)
+    # PEM is built from DER when it is requested
+    op.execute(cert_entities.update().values(pem_serialized=None))
+
+
+def downgrade() -> None:
+    convert('der_serialized', 'pem_serialized', der_to_pem)
+    with op.batch_alter_table('cert_entities') as batch_op:
+        batch_op.alter_column('pem_serialized', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('der_serialized')
@@ -0,0 +1,23 @@
+"""Index app state by block height
+
+Revision ID: 000000000300
+Revises: 000000000200
+Create Date: 2026-10-17 14:03:27.512046
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '000000000300'
+down_revision = '000000000200'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_app_state_block_height'), 'app_state', ['block_height'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_app_state_block_height'), table_name='app_state')
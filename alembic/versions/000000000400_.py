@@ -0,0 +1,43 @@
+"""Archive of expired certificates
+
+Revision ID: 000000000400
+Revises: 000000000300
+Create Date: 2026-10-17 16:41:09.270315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000000000400'
+down_revision = '000000000300'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('sn', 'name', 'public_key', 'der_serialized', 'pem_serialized', 'not_valid_after', 'not_valid_before',
+           'revocated_at')
+
+
+def upgrade() -> None:
+    op.create_table('cert_entities_archive',
+    sa.Column('sn', sa.LargeBinary(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('public_key', sa.LargeBinary(), nullable=False),
+    sa.Column('der_serialized', sa.LargeBinary(), nullable=False),
+    sa.Column('pem_serialized', sa.Text(), nullable=True),
+    sa.Column('not_valid_after', sa.DateTime(), nullable=False),
+    sa.Column('not_valid_before', sa.DateTime(), nullable=False),
+    sa.Column('revocated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sn')
+    )
+    op.create_index(op.f('ix_cert_entities_not_valid_after'), 'cert_entities', ['not_valid_after'], unique=False)
+
+
+def downgrade() -> None:
+    # Archived certificates are moved back
+    cert_entities = sa.table('cert_entities', *map(sa.column, COLUMNS))
+    archive = sa.table('cert_entities_archive', *map(sa.column, COLUMNS))
+    op.execute(cert_entities.insert().from_select(COLUMNS, sa.select(*archive.c)))
+    op.drop_index(op.f('ix_cert_entities_not_valid_after'), table_name='cert_entities')
+    op.drop_table('cert_entities_archive')
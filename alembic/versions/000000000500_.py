@@ -0,0 +1,44 @@
+"""Covering indexes of certificate lookups and of the latest app state
+
+Revision ID: 000000000500
+Revises: 000000000400
+Create Date: 2026-10-17 18:22:51.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '000000000500'
+down_revision = '000000000400'
+branch_labels = None
+depends_on = None
+
+NOT_REVOKED = sa.text('revocated_at IS NULL')
+REVOKED = sa.text('revocated_at IS NOT NULL')
+
+
+def upgrade() -> None:
+    op.drop_index('ix_cert_entities_name', table_name='cert_entities')
+    op.drop_index('ix_cert_entities_public_key', table_name='cert_entities')
+    op.drop_index('ix_app_state_block_height', table_name='app_state')
+    op.create_index('ix_cert_entities_valid_by_name', 'cert_entities',
+                    ['name', 'not_valid_after', 'not_valid_before', 'sn', 'revocated_at'], unique=False,
+                    sqlite_where=NOT_REVOKED, postgresql_where=NOT_REVOKED)
+    op.create_index('ix_cert_entities_live_by_public_key', 'cert_entities',
+                    ['public_key', 'not_valid_after', 'not_valid_before', 'sn', 'revocated_at'], unique=False,
+                    sqlite_where=NOT_REVOKED, postgresql_where=NOT_REVOKED)
+    op.create_index('ix_cert_entities_revoked', 'cert_entities', ['revocated_at', 'sn'], unique=False,
+                    sqlite_where=REVOKED, postgresql_where=REVOKED)
+    op.create_index('ix_app_state_latest', 'app_state', ['block_height', 'app_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_app_state_latest', table_name='app_state')
+    op.drop_index('ix_cert_entities_revoked', table_name='cert_entities')
+    op.drop_index('ix_cert_entities_live_by_public_key', table_name='cert_entities')
+    op.drop_index('ix_cert_entities_valid_by_name', table_name='cert_entities')
+    op.create_index('ix_app_state_block_height', 'app_state', ['block_height'], unique=False)
+    op.create_index('ix_cert_entities_public_key', 'cert_entities', ['public_key'], unique=False)
+    op.create_index('ix_cert_entities_name', 'cert_entities', ['name'], unique=False)
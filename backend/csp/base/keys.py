@@ -7,6 +7,8 @@ class Key(ABC):
     """ Key interface
     """
 
+    __slots__ = ()
+
     @property
     @abstractmethod
     def raw(self):
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from dataclasses import dataclass
 
 from cryptography.hazmat.primitives import serialization
@@ -15,11 +16,22 @@ class KeyOpts(base.KeyOpts):
     algorithm: str = 'ed25519'
 
 
+@dataclass(kw_only=True)
+class SignerOpts(base.SignerOpts):
+    """ Ed25519 signer options. If `hash_options` is not set message is signed as is (PureEdDSA, as in X.509)
+    """
+    hash_options: base.HashOpts = None
+
+
 class Key(base.Key):
     """ Implementation of `csp.base.Key` for ed25519 keys
     """
 
+    __slots__ = ('__raw', '__opts', '__bytes', '__public_key')
+
     def __init__(self, raw: bytes | Ed25519PrivateKey | Ed25519PublicKey = None, opts: KeyOpts = None):
+        self.__bytes = None
+        self.__public_key = None
         if raw is not None:
             if isinstance(raw, bytes):
                 assert opts, "`opts` must be defined if first parameters is bytes"
@@ -27,6 +39,7 @@ class Key(base.Key):
                     self.__raw = Ed25519PrivateKey.from_private_bytes(raw[:32])
                 else:
                     self.__raw = Ed25519PublicKey.from_public_bytes(raw)
+                    self.__bytes = raw
             else:
                 self.__raw = raw
                 opts = KeyOpts(private=isinstance(raw, Ed25519PrivateKey))
@@ -36,15 +49,23 @@ class Key(base.Key):
         self.__opts = opts
 
     def __bytes__(self) -> bytes:
-        return (self.raw.private_bytes(encoding=serialization.Encoding.Raw,
-                                       format=serialization.PrivateFormat.Raw,
-                                       encryption_algorithm=serialization.NoEncryption())
-                if self.private else self.raw.public_bytes(encoding=serialization.Encoding.Raw,
-                                                           format=serialization.PublicFormat.Raw))
+        if self.__bytes is None:
+            self.__bytes = (self.raw.private_bytes(encoding=serialization.Encoding.Raw,
+                                                   format=serialization.PrivateFormat.Raw,
+                                                   encryption_algorithm=serialization.NoEncryption())
+                            if self.private else self.raw.public_bytes(encoding=serialization.Encoding.Raw,
+                                                                       format=serialization.PublicFormat.Raw))
+        return self.__bytes
 
     @property
     def public_key(self) -> 'Key':
-        return Key(self.__raw.public_key(), KeyOpts(private=False)) if self.private else self
+        if self.__public_key is None:
+            if self.private:
+                self.__public_key = public_key(self.__raw.public_key().public_bytes(
+                    encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw))
+            else:
+                self.__public_key = self
+        return self.__public_key
 
     @property
     def raw(self) -> Ed25519PrivateKey | Ed25519PublicKey:
@@ -61,3 +82,25 @@ class Key(base.Key):
     @property
     def symmetric(self) -> bool:
         return False
+
+
+PUBLIC_OPTS = KeyOpts(private=False)
+INTERN_SIZE = 4096
+
+_interned = OrderedDict()  # type: OrderedDict[bytes, Key]
+
+
+def public_key(raw: bytes | Ed25519PublicKey) -> Key:
+    """ Returns shared instance of public key. Instances are interned by raw bytes,
+    up to `INTERN_SIZE` least recently used keys are kept.
+    """
+    if not isinstance(raw, bytes):
+        raw = raw.public_bytes(encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw)
+    key = _interned.get(raw)
+    if key is None:
+        key = _interned[raw] = Key(raw, PUBLIC_OPTS)
+        while len(_interned) > INTERN_SIZE:
+            _interned.popitem(last=False)
+    else:
+        _interned.move_to_end(raw)
+    return key
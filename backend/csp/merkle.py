@@ -0,0 +1,201 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+from csp import base, sha256
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+EMPTY = bytes(32)
+
+
+class _Leaf:
+    __slots__ = ('path', 'value', 'hash')
+
+    def __init__(self, path: bytes, value: bytes):
+        self.path = path
+        self.value = value
+        self.hash = hashlib.sha256(LEAF_PREFIX + path + value).digest()
+
+
+class _Node:
+    __slots__ = ('left', 'right', 'hash')
+
+    def __init__(self, left: '_Tree', right: '_Tree'):
+        self.left = left
+        self.right = right
+        self.hash = hashlib.sha256(NODE_PREFIX + (left.hash if left else EMPTY) +
+                                   (right.hash if right else EMPTY)).digest()
+
+
+_Tree = Optional[_Leaf | _Node]
+
+
+def _bit(path: bytes, depth: int) -> int:
+    return (path[depth >> 3] >> (7 - (depth & 7))) & 1
+
+
+def _join(depth: int, one: _Leaf, other: _Leaf) -> _Node:
+    """ Makes subtree at `depth` with two leaves """
+    bit = _bit(one.path, depth)
+    if bit != _bit(other.path, depth):
+        return _Node(other, one) if bit else _Node(one, other)
+    child = _join(depth + 1, one, other)
+    return _Node(None, child) if bit else _Node(child, None)
+
+
+def _insert(tree: _Tree, depth: int, leaf: _Leaf) -> _Tree:
+    if tree is None:
+        return leaf
+    if isinstance(tree, _Leaf):
+        return leaf if tree.path == leaf.path else _join(depth, tree, leaf)
+    if _bit(leaf.path, depth):
+        return _Node(tree.left, _insert(tree.right, depth + 1, leaf))
+    return _Node(_insert(tree.left, depth + 1, leaf), tree.right)
+
+
+def _remove(tree: _Tree, depth: int, path: bytes) -> _Tree:
+    if tree is None:
+        return None
+    if isinstance(tree, _Leaf):
+        return None if tree.path == path else tree
+    if _bit(path, depth):
+        left, right = tree.left, _remove(tree.right, depth + 1, path)
+        if right is tree.right:
+            return tree
+    else:
+        left, right = _remove(tree.left, depth + 1, path), tree.right
+        if left is tree.left:
+            return tree
+    # Single leaf subtree is represented by leaf itself
+    if left is None and (right is None or isinstance(right, _Leaf)):
+        return right
+    if right is None and isinstance(left, _Leaf):
+        return left
+    return _Node(left, right)
+
+
+@dataclass(frozen=True)
+class Proof:
+    """ Proof of value (or absence of value) of key in sparse Merkle tree
+
+    Attributes:
+        siblings: Hashes of siblings from root to the terminal subtree.
+        leaf: Path and value of leaf found at the terminal position, `None` if position is empty.
+    """
+    siblings: tuple[bytes, ...]
+    leaf: Optional[tuple[bytes, bytes]]
+
+
+class SparseMerkleTree(base.BlockHasher):
+    """ Sparse Merkle tree over sha256 paths of keys.
+
+    Subtrees with single leaf are represented by leaf itself, so updates cost O(log n) hashing.
+    Nodes are never modified in place; changes made after `begin` are undone with `rollback`.
+    """
+
+    def __init__(self):
+        super().__init__(sha256.HashOpts())
+        self.__root = None  # type: _Tree
+        self.__saved = None  # type: Optional[tuple[_Tree]]
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def size(self) -> int:
+        return hashlib.sha256().digest_size
+
+    @property
+    def block_size(self) -> int:
+        return hashlib.sha256().block_size
+
+    @staticmethod
+    def path(key: bytes) -> bytes:
+        """ Path of leaf for key """
+        return sha256.digest(key)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        """ Returns value of `key` """
+        path, tree, depth = self.path(key), self.__root, 0
+        while isinstance(tree, _Node):
+            tree = tree.right if _bit(path, depth) else tree.left
+            depth += 1
+        return tree.value if tree is not None and tree.path == path else None
+
+    def update(self, key: bytes, value: bytes):
+        """ Sets `value` (hash of data) for `key` """
+        leaf = _Leaf(self.path(key), value)
+        if self.get(key) is None:
+            self.__count += 1
+        self.__root = _insert(self.__root, 0, leaf)
+
+    def remove(self, key: bytes):
+        """ Removes `key` from tree """
+        if self.get(key) is not None:
+            self.__count -= 1
+            self.__root = _remove(self.__root, 0, self.path(key))
+
+    def write_data(self, block: bytes) -> bytes:
+        digest = sha256.digest(block)
+        self.write_hash(digest)
+        return digest
+
+    def write_hash(self, block: bytes):
+        self.update(block, block)
+
+    def sum(self, prefix: bytes = None) -> bytes:
+        return (prefix or b'') + (self.__root.hash if self.__root else EMPTY)
+
+    def begin(self):
+        """ Remembers current state """
+        if self.__saved is None:
+            self.__saved = (self.__root, self.__count)
+
+    def commit(self):
+        """ Accepts changes made since `begin` """
+        self.__saved = None
+
+    def rollback(self):
+        """ Returns to state remembered by `begin` """
+        if self.__saved is not None:
+            (self.__root, self.__count), self.__saved = self.__saved, None
+
+    def prove(self, key: bytes) -> Proof:
+        """ Returns proof of value of `key` or its absence """
+        path, tree, depth, siblings = self.path(key), self.__root, 0, []
+        while isinstance(tree, _Node):
+            bit = _bit(path, depth)
+            sibling = tree.left if bit else tree.right
+            siblings.append(sibling.hash if sibling else EMPTY)
+            tree = tree.right if bit else tree.left
+            depth += 1
+        return Proof(tuple(siblings), (tree.path, tree.value) if tree is not None else None)
+
+
+def verify_proof(root: bytes, key: bytes, value: Optional[bytes], proof: Proof) -> bool:
+    """ Verifies that `key` has `value` (or is absent if `value` is None) in tree with `root` """
+    path = SparseMerkleTree.path(key)
+    depth = len(proof.siblings)
+    if proof.leaf is None:
+        if value is not None:
+            return False
+        node = EMPTY if depth else None
+    else:
+        leaf_path, leaf_value = proof.leaf
+        if any(_bit(leaf_path, i) != _bit(path, i) for i in range(depth)):
+            return False
+        if value is None:
+            if leaf_path == path:
+                return False
+        elif leaf_path != path or leaf_value != value:
+            return False
+        node = _Leaf(leaf_path, leaf_value).hash
+    if node is None:
+        return root == EMPTY
+    for i in reversed(range(depth)):
+        sibling = proof.siblings[i]
+        pair = sibling + node if _bit(path, i) else node + sibling
+        node = hashlib.sha256(NODE_PREFIX + pair).digest()
+    return node == root
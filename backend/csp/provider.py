@@ -1,11 +1,24 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+from cryptography.exceptions import InvalidSignature
+
 from csp import ed25519, sha256
 from csp.base import Hasher, EncrypterOpts, DecrypterOpts, Key, KeyOpts, HashOpts, SignerOpts
 
+VERIFY_BATCH_MIN = 64
+
 
 class CSProvider:
     """ Crypto service provider
     """
 
+    def __init__(self, max_workers: int = None):
+        self.__max_workers = max_workers or os.cpu_count() or 1
+        self.__executor = None
+
     def key_gen(self, opts: 'KeyOpts') -> 'Key':
         """ Generates key  with use `opts`.
         """
@@ -22,7 +35,11 @@ class CSProvider:
         """ Imports key from `raw` representation
         """
         if isinstance(opts, ed25519.KeyOpts):
+            if opts == ed25519.PUBLIC_OPTS and isinstance(raw, bytes):
+                return ed25519.public_key(raw)
             return ed25519.Key(raw, opts)
+        elif isinstance(raw, ed25519.Ed25519PublicKey):
+            return ed25519.public_key(raw)
         elif isinstance(raw, ed25519.KeyTypes):
             return ed25519.Key(raw, opts)
         qn = {opts.__class__.__qualname__ if opts else raw.__class__.__qualname__}
@@ -46,20 +63,45 @@ class CSProvider:
         """ Signs digest using `key` and `opts` """
         if isinstance(key.opts, ed25519.KeyOpts):
             raw = key.raw  # type:ed25519.Ed25519PrivateKey
-            return raw.sign(self.hash(digest, opts.hash_options))
+            return raw.sign(self.hash(digest, opts.hash_options) if opts.hash_options else digest)
         raise NotImplementedError(f'`sign` for key {key.__class__.__qualname__} not yet implemented')
 
     def verify(self, pub: 'Key', signature: bytes, digest: bytes, opts: 'SignerOpts') -> bool:
         """ Verifies signature against `key` and `digest` with use `opts` """
         if isinstance(pub.opts, ed25519.KeyOpts):
-            raw = pub.public_key.raw  # type:ed25519.Ed25519PublicKey
-            try:
-                raw.verify(signature, self.hash(digest, opts.hash_options))
-                return True
-            except Exception:
-                return False
+            return _verify_ed25519([(pub.public_key.raw, signature, digest)], self._get_digest(opts))[0]
         raise NotImplementedError(f'`verify` for key {pub.__class__.__qualname__} not yet implemented')
 
+    def verify_batch(self, items: Iterable[tuple['Key', bytes, bytes]], opts: 'SignerOpts') -> list[bool]:
+        """ Verifies signatures of `items` with use `opts`. Each item is tuple of key, signature and digest.
+        Large batches are verified in thread pool.
+
+        Returns:
+            Verification result for each item in the same order.
+        """
+        prepared = []
+        for pub, signature, digest in items:
+            if not isinstance(pub.opts, ed25519.KeyOpts):
+                raise NotImplementedError(f'`verify` for key {pub.__class__.__qualname__} not yet implemented')
+            prepared.append((pub.public_key.raw, signature, digest))
+        get_digest = self._get_digest(opts)
+        if len(prepared) < VERIFY_BATCH_MIN or self.__max_workers == 1:
+            return _verify_ed25519(prepared, get_digest)
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(self.__max_workers, thread_name_prefix='csp-verify')
+        size = -(-len(prepared) // self.__max_workers)
+        futures = [self.__executor.submit(_verify_ed25519, prepared[i:i + size], get_digest)
+                   for i in range(0, len(prepared), size)]
+        return list(itertools.chain.from_iterable(future.result() for future in futures))
+
+    def _get_digest(self, opts: 'SignerOpts') -> Callable[[bytes], bytes]:
+        hash_options = opts.hash_options
+        if hash_options is None:
+            return lambda digest: digest
+        if isinstance(hash_options, sha256.HashOpts):
+            return sha256.digest
+        return lambda digest: self.hash(digest, hash_options)
+
     def encrypt(self, key: 'Key', plaintext: bytes, opts: 'EncrypterOpts') -> bytes:
         """ Encrypts plaintext using `key` and `opts` """
         raise NotImplementedError(f'`encrypt` with option {opts.__class__.__qualname__} not yet implemented')
@@ -67,3 +109,15 @@ class CSProvider:
     def decrypt(self, key: 'Key', ciphertext: bytes, opts: 'DecrypterOpts') -> bytes:
         """ Decrypt decrypts ciphertext using `key`  and `opts` """
         raise NotImplementedError(f'`decrypt` with option {opts.__class__.__qualname__} not yet implemented')
+
+
+def _verify_ed25519(items: list[tuple['ed25519.Ed25519PublicKey', bytes, bytes]],
+                    get_digest: Callable[[bytes], bytes]) -> list[bool]:
+    result = []
+    for raw, signature, digest in items:
+        try:
+            raw.verify(signature, get_digest(digest))
+            result.append(True)
+        except InvalidSignature:
+            result.append(False)
+    return result
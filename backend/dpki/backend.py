@@ -1,12 +1,18 @@
 import logging
 import asyncio
 import dpki.chain
+from dpki import metrics
 
 
 def start_chain_app():
     from tend.abci import Server
+
+    async def main():
+        await metrics.start()
+        await Server(dpki.chain.Application()).start()
+
     logging.basicConfig(level=logging.INFO)
-    asyncio.run(Server(dpki.chain.Application()).start())
+    asyncio.run(main())
 
 
 if __name__ == '__main__':
@@ -1,28 +1,166 @@
+import asyncio
+from functools import cached_property
+from typing import TYPE_CHECKING
+
 import tend.abci.ext
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncEngine
 from tend import abci
 from tend.abci.ext import AppState
 
-from csp.provider import CSProvider
-from dpki import database, database as t
+from csp.merkle import SparseMerkleTree
+from dpki import database, database as t, metrics
 from .checker import TxChecker
+from .index import CertIndex
 from .keeper import TxKeeper
+from .revocations import RevocationSet
+from .state import load_state
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from csp.provider import CSProvider
+    from .archive import Archiver
+    from .mempool import MempoolFilter
+    from .path import PathValidator
+    from .query import QueryHandler
+    from .snapshots import SnapshotStore
+    from .validator import TxValidator
+
+# The latest committed state, it is read from covering index `ix_app_state_latest` alone
+SELECT_LATEST = select(t.app_state.c.block_height, t.app_state.c.app_hash) \
+    .order_by(desc(t.app_state.c.block_height)).limit(1)
 
 
 class Application(abci.ext.Application):
     """ ABCI Chain application
+
+    Only the latest app state is read on Info handshake, certificate index and state tree are loaded by
+    background task which handlers wait for with `ready`. Components which need cryptography are made on
+    first use, so their modules are not imported before the first transaction or query.
+
+    Attributes:
+        database: Engine of consensus writer.
+        reader: Engine of read-only connections, e.g. for queries.
     """
     database: AsyncEngine
+    reader: AsyncEngine
 
     def __init__(self, logger=None):
-        self.csp = CSProvider()
         self.database = database.engine_factory()
+        self.reader = database.engine_factory(readonly=True)
+        metrics.instrument_engine(self.database, 'writer')
+        metrics.instrument_engine(self.reader, 'reader')
+        self.index = CertIndex()
+        self.tree = SparseMerkleTree()
+        self.revocations = RevocationSet()
+        self.loading = None  # type: Optional[asyncio.Task]
         super().__init__(TxChecker(self), TxKeeper(self), logger)
 
+    @cached_property
+    def csp(self) -> 'CSProvider':
+        from csp.provider import CSProvider
+        return metrics.InstrumentedProvider(CSProvider())
+
+    @cached_property
+    def paths(self) -> 'PathValidator':
+        from .path import PathValidator
+        return PathValidator(self)
+
+    @cached_property
+    def validator(self) -> 'TxValidator':
+        from .validator import TxValidator
+        return TxValidator(self)
+
+    @cached_property
+    def archive(self) -> 'Archiver':
+        from .archive import Archiver
+        return Archiver(self)
+
+    @cached_property
+    def mempool(self) -> 'MempoolFilter':
+        from .mempool import MempoolFilter
+        return MempoolFilter()
+
+    @cached_property
+    def queries(self) -> 'QueryHandler':
+        from .query import QueryHandler
+        return QueryHandler(self)
+
+    @cached_property
+    def snapshots(self) -> 'SnapshotStore':
+        from .snapshots import SnapshotStore
+        return SnapshotStore(self)
+
     async def get_initial_app_state(self):
-        async with self.database.begin() as ac:
-            select_stmt = select(t.app_state).order_by(desc(t.app_state.c.created_at)).limit(1)
-            async for obj in await ac.stream(select_stmt):
-                return AppState(block_height=obj.block_height, app_hash=obj.app_hash)
-        return AppState()
+        async with self.reader.connect() as connection:
+            obj = (await connection.execute(SELECT_LATEST)).one_or_none()
+        state = AppState() if obj is None else AppState(block_height=obj.block_height, app_hash=obj.app_hash)
+        if self.loading is None:
+            self.loading = asyncio.create_task(self._load(state))
+        return state
+
+    async def _load(self, state: AppState):
+        async with self.reader.connect() as connection:
+            await load_state(self.index, self.tree, connection)
+        self.logger.info(f'Loaded state of {len(self.index)} certificates')
+        if state.block_height and state.app_hash != self.tree.sum():
+            message = f'State hash {self.tree.sum().hex()} does not match app hash ' \
+                      f'{state.app_hash.hex()} of height {state.block_height}'
+            self.logger.error(message)
+            raise RuntimeError(message)
+        self.reset_committed(state.block_height)
+
+    async def ready(self):
+        """ Waits until certificate index and state tree are loaded
+
+        Raises:
+            RuntimeError: If state loaded from database does not match the latest app hash.
+        """
+        if self.loading is not None:
+            await self.loading
+
+    def reset_committed(self, block_height: int):
+        """ Resets state derived from data committed at `block_height` """
+        self.revocations.reset((record.sn for record in self.index if record.revocated_at), block_height)
+        self.queries.invalidate((), block_height)
+
+    async def close(self):
+        """ Closes database connections, cancels background tasks """
+        if self.loading is not None and not self.loading.done():
+            self.loading.cancel()
+        if 'archive' in vars(self):
+            await self.archive.close()
+        if 'snapshots' in vars(self):
+            await self.snapshots.close()
+        await self.keeper.close()
+        await self.database.dispose()
+        await self.reader.dispose()
+
+    def reset_state(self):
+        """ Drops in-memory state, e.g. before it is restored from snapshot """
+        if self.loading is not None and not self.loading.done():
+            self.loading.cancel()
+        self.loading = None
+        self.index = CertIndex()
+        self.tree = SparseMerkleTree()
+        self.revocations = RevocationSet()
+        self.paths.clear()
+        self.mempool.clear()
+        self.queries.cache.clear()
+
+    @metrics.timed(metrics.HANDLER_SECONDS.labels('query'))
+    async def query(self, req):
+        await self.ready()
+        return await self.queries.query(req)
+
+    async def list_snapshots(self, req):
+        return await self.snapshots.list_snapshots(req)
+
+    async def offer_snapshot(self, req):
+        return await self.snapshots.offer_snapshot(req)
+
+    async def load_snapshot_chunk(self, req):
+        return await self.snapshots.load_snapshot_chunk(req)
+
+    async def apply_snapshot_chunk(self, req):
+        return await self.snapshots.apply_snapshot_chunk(req)
@@ -0,0 +1,78 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, insert, select
+
+from dpki import database as t, metrics
+from .utils import utc_naive
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from . import Application
+
+BATCH_SIZE = 10_000
+
+ARCHIVED = metrics.REGISTRY.counter('dpki_archived_certs', 'Certificates moved to archive')
+
+
+class Archiver:
+    """ Moves certificates expired longer than `retention` from `cert_entities` to `cert_entities_archive`.
+
+    Runs in background after commit and moves `batch_size` certificates at most, in one database transaction,
+    archival of the next block is skipped while the previous one is running. Archive is
+    local to node and it is not part of state: archived certificates stay in index and state tree, both tables
+    are loaded on start, so app hash does not depend on archival. Archived certificates are looked up by serial
+    number only. Retention is set in days by environment variable `ARCHIVE_RETENTION_DAYS`, archival is
+    disabled if it is not set.
+    """
+
+    def __init__(self, app: 'Application', retention: timedelta = None, batch_size: int = BATCH_SIZE):
+        self.app = app
+        if retention is None and os.environ.get('ARCHIVE_RETENTION_DAYS'):
+            retention = timedelta(days=float(os.environ['ARCHIVE_RETENTION_DAYS']))
+        self.retention = retention  # type: Optional[timedelta]
+        self.batch_size = batch_size
+        self.archiving = None  # type: Optional[asyncio.Task]
+
+    async def commit(self, now: datetime):
+        """ Starts archival in background, it is skipped if the previous one is still running """
+        if self.retention is None or (self.archiving is not None and not self.archiving.done()):
+            return
+        self.archiving = asyncio.create_task(self._archive(now))
+
+    async def _archive(self, now: datetime):
+        try:
+            await self.archive(now)
+        except Exception as exc:
+            self.app.logger.error(f'Archival has failed: {exc!r}')
+
+    async def close(self):
+        """ Cancels archival being run """
+        if self.archiving is not None and not self.archiving.done():
+            self.archiving.cancel()
+            try:
+                await self.archiving
+            except asyncio.CancelledError:
+                pass
+
+    async def archive(self, now: datetime) -> int:
+        """ Archives certificates expired before `now` - `retention`, returns count of archived ones """
+        if self.retention is None:
+            return 0
+        c = t.cert_entities.c
+        serials = select(c.sn) \
+            .where(c.not_valid_after < utc_naive(now) - self.retention) \
+            .order_by(c.not_valid_after, c.sn) \
+            .limit(self.batch_size) \
+            .scalar_subquery()
+        columns = [column.name for column in t.cert_entities_archive.c]
+        async with self.app.database.begin() as connection:
+            await connection.execute(insert(t.cert_entities_archive).from_select(
+                columns, select(*(c[column] for column in columns)).where(c.sn.in_(serials))))
+            count = (await connection.execute(delete(t.cert_entities).where(c.sn.in_(serials)))).rowcount
+        if count:
+            ARCHIVED.inc(count)
+            self.app.logger.info(f'Archived {count} expired certificates')
+        return count
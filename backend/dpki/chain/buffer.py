@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import bindparam, insert, update
+
+from dpki import database as t
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from sqlalchemy.ext.asyncio import AsyncConnection
+    from ..models import CertEntity
+
+
+class BlockBuffer:
+    """ Write-behind buffer of block state changes.
+
+    Changes are collected in memory while block is delivered and are written by `flush`
+    with one `executemany` per statement shape.
+    """
+
+    def __init__(self):
+        self.__inserts = []  # type: list[CertEntity]
+        self.__revocations = dict()  # type: dict[bytes, datetime]
+        self.__app_state = None  # type: Optional[dict]
+
+    def __len__(self):
+        return len(self.__inserts) + len(self.__revocations) + (1 if self.__app_state else 0)
+
+    def serials(self) -> set[bytes]:
+        """ Serial numbers of certificates changed in block """
+        return {entity.sn for entity in self.__inserts} | self.__revocations.keys()
+
+    def revoked(self) -> list[bytes]:
+        """ Serial numbers of certificates revoked in block """
+        return list(self.__revocations)
+
+    def insert_cert(self, entity: 'CertEntity'):
+        """ Adds certificate to insert into `cert_entities` """
+        self.__inserts.append(entity)
+
+    def revoke_cert(self, sn: bytes, revocated_at: datetime):
+        """ Adds revocation of certificate """
+        self.__revocations[sn] = revocated_at
+
+    def set_app_state(self, block_height: int, app_hash: bytes, created_at: datetime):
+        """ Sets row to insert into `app_state` """
+        self.__app_state = dict(block_height=block_height, app_hash=app_hash, created_at=created_at)
+
+    def clear(self):
+        self.__inserts = []
+        self.__revocations = dict()
+        self.__app_state = None
+
+    async def flush(self, connection: 'AsyncConnection'):
+        """ Writes collected changes using `connection` and clears buffer """
+        if self.__inserts:
+            await connection.execute(insert(t.cert_entities), [entity.to_row() for entity in self.__inserts])
+        if self.__revocations:
+            params = [dict(b_sn=sn, b_revocated_at=revocated_at) for sn, revocated_at in self.__revocations.items()]
+            # Certificate may have been archived
+            for table in (t.cert_entities, t.cert_entities_archive):
+                update_stmt = update(table) \
+                    .where(table.c.sn == bindparam('b_sn')) \
+                    .values(revocated_at=bindparam('b_revocated_at'))
+                await connection.execute(update_stmt, params)
+        if self.__app_state:
+            await connection.execute(insert(t.app_state), self.__app_state)
+        self.clear()
@@ -1,11 +1,38 @@
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
 import tend.abci.ext
 from tend import abci
 from tend.abci.handlers import ResultCode, ResponseCheckTx
 
+from dpki import metrics
+
+if TYPE_CHECKING:
+    from . import Application
+
 
 class TxChecker(abci.ext.TxChecker):
     """ TX checker
+
+    Repeated transactions and operations with pending certificates are rejected by `Application.mempool`
+    before validation.
     """
 
+    app: 'Application'
+
+    @metrics.timed(metrics.HANDLER_SECONDS.labels('check_tx'))
     async def check_tx(self, req):
+        from .tx import TxError
+        await self.app.ready()
+        validator, mempool = self.app.validator, self.app.mempool
+        try:
+            mempool.check_data(req.tx)
+            tx = validator.decode(req.tx)
+            mempool.check(tx)
+            await validator.validate(tx, datetime.now(timezone.utc))
+        except TxError as exc:
+            metrics.TXS.labels('check_tx', exc.code.name).inc()
+            return ResponseCheckTx(code=exc.code, log=str(exc))
+        mempool.add(tx)
+        metrics.TXS.labels('check_tx', 'OK').inc()
         return ResponseCheckTx(code=ResultCode.OK)
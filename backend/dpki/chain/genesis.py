@@ -0,0 +1,168 @@
+import asyncio
+import io
+import json
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+
+from csp.provider import CSProvider
+from .index import CertRecord
+from .path import is_ca
+from ..models import CertEntity
+from ..workers import chunked, map_chunks
+
+if TYPE_CHECKING:
+    from typing import Awaitable, Callable, Iterable, Iterator
+
+CHUNK_SIZE = 512
+BATCH_SIZE = 5000
+READ_SIZE = 1 << 16
+
+_csp = None  # type: CSProvider | None
+
+
+class _Scanner:
+    """ Incremental JSON scanner over text stream. Keeps in memory only not yet consumed part of the stream. """
+
+    _decoder = json.JSONDecoder()
+    _whitespace = ' \t\n\r'
+
+    def __init__(self, stream: 'io.TextIOBase', read_size: int):
+        self.stream = stream
+        self.read_size = read_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._whitespace:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError('Unexpected end of genesis app state')
+
+    def expect(self, *chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f'Expected one of {chars!r} but got {char!r} in genesis app state')
+        self.pos += 1
+        return char
+
+    def string(self) -> str:
+        self.expect('"')
+        return self._decode(lambda: json.decoder.scanstring(self.buf, self.pos))
+
+    def value(self):
+        self.peek()
+        return self._decode(lambda: self._decoder.raw_decode(self.buf, self.pos))
+
+    def _decode(self, decode):
+        while True:
+            try:
+                value, end = decode()
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # Token may continue in the next chunk (for example number)
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_certificates(source: 'bytes | io.RawIOBase | io.BufferedIOBase',
+                      read_size: int = READ_SIZE) -> 'Iterator[str]':
+    """ Yields PEM serialized certificates from `certificates` list of genesis app state one by one.
+
+    Genesis app state is read incrementally from `source` by `read_size` blocks, so list of certificates
+    is never kept in memory in whole.
+    """
+    stream = io.TextIOWrapper(io.BytesIO(source) if isinstance(source, bytes) else source, encoding='utf8')
+    scanner = _Scanner(stream, read_size)
+    found = False
+    scanner.expect('{')
+    if scanner.peek() != '}':
+        while True:
+            key = scanner.string()
+            scanner.expect(':')
+            if key == 'certificates':
+                found = True
+                scanner.expect('[')
+                if scanner.peek() != ']':
+                    while True:
+                        yield scanner.string()
+                        if scanner.expect(',', ']') == ']':
+                            break
+                else:
+                    scanner.expect(']')
+            else:
+                scanner.value()
+            if scanner.expect(',', '}') == '}':
+                break
+    else:
+        scanner.expect('}')
+    if not found:
+        raise KeyError('certificates')
+
+
+def make_cert_row(pem_serialized: str, csp: 'CSProvider') -> tuple[CertEntity, CertRecord]:
+    """ Parses PEM serialized certificate and builds record for `cert_entities` and index record """
+    cert = x509.load_pem_x509_certificate(pem_serialized.encode('utf8'), backend=default_backend())
+    entity = CertEntity.from_certificate(cert, bytes(csp.key_import(cert.public_key())))
+    record = CertRecord(entity.sn, entity.name, entity.public_key, entity.not_valid_before, entity.not_valid_after,
+                        issuer=cert.issuer.rfc4514_string(), ca=is_ca(cert))
+    return entity, record
+
+
+def parse_chunk(chunk: list[str]) -> list[tuple[CertEntity, CertRecord]]:
+    """ Builds rows for chunk of PEM serialized certificates """
+    global _csp
+    if _csp is None:
+        _csp = CSProvider()
+    return [make_cert_row(pem_serialized, _csp) for pem_serialized in chunk]
+
+
+async def ingest(pems: 'Iterable[str]', insert_rows: 'Callable[[list[tuple[dict, CertRecord]]], Awaitable]',
+                 workers: int = None, executor: Executor = None, chunk_size: int = CHUNK_SIZE,
+                 batch_size: int = BATCH_SIZE) -> int:
+    """ Loads PEM serialized certificates into state.
+
+    Certificates are parsed by chunks in worker processes, see `map_chunks` for `workers` and `executor`.
+    Rows with their index records are passed to `insert_rows` in the original order by batches
+    with `batch_size` rows at most.
+
+    Returns:
+        Count of loaded certificates.
+    """
+    batch = []
+    count = 0
+    results = map_chunks(parse_chunk, chunked(pems, chunk_size), workers, executor)
+    try:
+        for future in results:
+            batch.extend(await asyncio.wrap_future(future))
+            while len(batch) >= batch_size:
+                rows, batch = batch[:batch_size], batch[batch_size:]
+                count += len(rows)
+                await insert_rows(rows)
+        if batch:
+            count += len(batch)
+            await insert_rows(batch)
+    finally:
+        results.close()
+    return count
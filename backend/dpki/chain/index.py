@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable
+
+from .utils import utc_naive
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+
+class CertRecord:
+    """ Compact record of certificate in index
+
+    Attributes:
+        sn: Serial number.
+        name: Distinguished name.
+        public_key: Bytes representation of public key.
+        not_valid_before: Certificate valid from this date (naive UTC).
+        not_valid_after: Certificate valid till this date (naive UTC).
+        revocated_at: Certificate has revocated from this date (naive UTC).
+        issuer: Distinguished name of issuer, `None` if not yet known.
+        ca: True if certificate belongs to CA, `None` if not yet known.
+    """
+    __slots__ = ('sn', 'name', 'public_key', 'not_valid_before', 'not_valid_after', 'revocated_at', 'issuer', 'ca')
+
+    def __init__(self, sn: bytes, name: str, public_key: bytes, not_valid_before: datetime,
+                 not_valid_after: datetime, revocated_at: datetime = None, issuer: str = None, ca: bool = None):
+        self.sn = sn
+        self.name = name
+        self.public_key = public_key
+        self.not_valid_before = utc_naive(not_valid_before)
+        self.not_valid_after = utc_naive(not_valid_after)
+        self.revocated_at = utc_naive(revocated_at) if revocated_at else None
+        self.issuer = issuer
+        self.ca = ca
+
+    def is_valid(self, now: datetime) -> bool:
+        """ True if certificate is not revocated and `now` (naive UTC) is in validity window """
+        return self.revocated_at is None and self.not_valid_before <= now <= self.not_valid_after
+
+
+class CertIndex:
+    """ In-memory index of certificates by serial number, subject name and public key.
+
+    Changes made between `begin` and `commit` are journaled and can be undone with `rollback`.
+    """
+
+    def __init__(self):
+        self.__by_sn = dict()  # type: dict[bytes, CertRecord]
+        self.__by_name = dict()  # type: dict[str, list[CertRecord]]
+        self.__by_public_key = dict()  # type: dict[bytes, list[CertRecord]]
+        self.__journal = None  # type: Optional[list[Callable[[], None]]]
+
+    def __len__(self):
+        return len(self.__by_sn)
+
+    def __iter__(self):
+        return iter(self.__by_sn.values())
+
+    def get(self, sn: bytes) -> 'Optional[CertRecord]':
+        return self.__by_sn.get(sn)
+
+    def find_by_name(self, name: str) -> list[CertRecord]:
+        return self.__by_name.get(name, [])
+
+    def find_by_public_key(self, public_key: bytes) -> list[CertRecord]:
+        return self.__by_public_key.get(public_key, [])
+
+    def add(self, record: CertRecord):
+        """ Adds record of new certificate """
+        if record.sn in self.__by_sn:
+            raise KeyError(f'Certificate `{record.sn.hex()}` already indexed')
+        self.__insert(record)
+        self.__log(lambda: self.__remove(record))
+
+    def revoke(self, sn: bytes, revocated_at: datetime):
+        """ Marks certificate as revocated """
+        record = self.__by_sn[sn]
+        previous, record.revocated_at = record.revocated_at, utc_naive(revocated_at)
+        self.__log(lambda: setattr(record, 'revocated_at', previous))
+
+    def begin(self):
+        """ Starts journal of changes """
+        if self.__journal is None:
+            self.__journal = []
+
+    def commit(self):
+        """ Accepts changes made since `begin` """
+        self.__journal = None
+
+    def rollback(self):
+        """ Undoes changes made since `begin` """
+        journal, self.__journal = self.__journal or [], None
+        for undo in reversed(journal):
+            undo()
+
+    def __log(self, undo: Callable[[], None]):
+        if self.__journal is not None:
+            self.__journal.append(undo)
+
+    def __insert(self, record: CertRecord):
+        self.__by_sn[record.sn] = record
+        self.__by_name.setdefault(record.name, []).append(record)
+        self.__by_public_key.setdefault(record.public_key, []).append(record)
+
+    def __remove(self, record: CertRecord):
+        del self.__by_sn[record.sn]
+        for mapping, key in ((self.__by_name, record.name), (self.__by_public_key, record.public_key)):
+            records = mapping[key]
+            records.remove(record)
+            if not records:
+                del mapping[key]
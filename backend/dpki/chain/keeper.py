@@ -1,84 +1,183 @@
-import json
-from dataclasses import asdict
 from datetime import timezone, datetime
 from typing import TYPE_CHECKING
 
 import tend.abci.ext
-from cryptography import x509
-from cryptography.hazmat.backends import default_backend
 from sqlalchemy import insert
 from tend import abci
+from tend.abci.handlers import ResponseDeliverTx
 
-import csp.sha256
-from dpki import database as t
-from ..models import CertEntity
+from dpki import database as t, metrics
+from . import state
+from .buffer import BlockBuffer
+from .index import CertRecord
 
 if TYPE_CHECKING:
     from typing import Optional
     from . import Application
+    from .tx import Tx
+    from ..models import CertEntity
     from sqlalchemy.ext.asyncio import AsyncConnection
 
 
 class TxKeeper(abci.ext.TxKeeper):
     """ TX keeper
+
+    Writes go through one persistent connection which is reused across blocks. Modules which need cryptography
+    are imported on the first transaction.
     """
 
     app: 'Application'
 
     def __init__(self, *args, **kwargs):
         self.__connection = None  # type: Optional['AsyncConnection']
+        self.__in_transaction = False
+        self.buffer = BlockBuffer()
+        self.block_time = None  # type: Optional[datetime]
+        self.block_txs = 0
+        self.delivered = []  # type: list[bytes]
         super().__init__(*args, **kwargs)
 
     @property
     def connection(self) -> 'AsyncConnection':
-        if self.__connection is None:
+        if not self.__in_transaction:
             raise RuntimeError('Run `begin_transaction` before use connection')
         return self.__connection
 
     async def begin_transaction(self):
-        if self.__connection is None:
-            self.__connection = self.app.database.connect()
-            await self.__connection.start()
+        if not self.__in_transaction:
+            if self.__connection is None:
+                self.__connection = await self.app.database.connect().start()
+            self.__in_transaction = True
+            self.begin_changes()
 
     async def end_transaction(self):
-        await self.connection.commit()
-        await self.connection.close()
-        self.__connection = None
+        serials, revoked = self.buffer.serials(), self.buffer.revoked()
+        try:
+            await self.buffer.flush(self.connection)
+            await self.connection.commit()
+        except BaseException:
+            await self.abort_transaction()
+            raise
+        self.__in_transaction = False
+        self.app.index.commit()
+        self.app.tree.commit()
+        if 'paths' in vars(self.app):
+            self.app.paths.commit()
+        self.app.revocations.add_block(self.block_height, revoked)
+        self.app.queries.invalidate(serials, self.block_height)
+
+    async def abort_transaction(self):
+        self.buffer.clear()
+        self.__in_transaction = False
+        try:
+            if self.__connection is not None:
+                await self.__connection.rollback()
+        except BaseException:
+            await self.close()
+            raise
+        finally:
+            self.app.index.rollback()
+            self.app.tree.rollback()
+            if 'paths' in vars(self.app):
+                self.app.paths.rollback()
+
+    async def close(self):
+        """ Closes persistent connection """
+        connection, self.__connection = self.__connection, None
+        if connection is not None:
+            await connection.close()
 
+    def begin_changes(self):
+        """ Starts journal of in-memory state changes """
+        self.app.index.begin()
+        self.app.tree.begin()
+
+    @metrics.timed(metrics.HANDLER_SECONDS.labels('deliver_tx'))
     async def deliver_tx(self, req):
+        from .tx import TxError
+        validator = self.app.validator
+        self.block_txs += 1
+        try:
+            tx = validator.decode(req.tx)
+            await validator.validate(tx, self.block_time)
+        except TxError as exc:
+            metrics.TXS.labels('deliver_tx', exc.code.name).inc()
+            return ResponseDeliverTx(code=exc.code, log=str(exc))
+        self.apply_tx(tx)
+        validator.forget(tx)
+        self.delivered.append(tx.hash)
+        metrics.TXS.labels('deliver_tx', 'OK').inc()
         return await super().deliver_tx(req)
 
+    def apply_tx(self, tx: 'Tx'):
+        """ Applies validated transaction to index and block buffer """
+        from .path import is_ca
+        from .tx import IssueTx
+        from ..models import CertEntity
+        if isinstance(tx, IssueTx):
+            public_key = bytes(self.app.csp.key_import(tx.certificate.public_key()))
+            entity = CertEntity.from_certificate(tx.certificate, public_key, tx.der_serialized)
+            self.buffer.insert_cert(entity)
+            self.app.tree.update(entity.sn, state.cert_value(entity.der_serialized))
+            record = CertRecord(entity.sn, entity.name, entity.public_key, entity.not_valid_before,
+                                entity.not_valid_after, issuer=tx.certificate.issuer.rfc4514_string(),
+                                ca=is_ca(tx.certificate))
+            self.app.index.add(record)
+            self.app.paths.add(record.sn, tx.certificate)
+        else:
+            self.buffer.revoke_cert(tx.sn, self.block_time)
+            self.app.paths.invalidate(tx.sn)
+            self.app.index.revoke(tx.sn, self.block_time)
+            self.app.tree.update(tx.sn, state.revoked_value(self.app.tree.get(tx.sn), self.block_time))
+
     async def load_genesis(self, genesis_data: bytes):
+        from . import genesis
+        await self.app.ready()
         await self.begin_transaction()
         self.app.logger.info(f'Received genesis app state with size: {len(genesis_data)}')
-        certs = []
-        data = json.loads(genesis_data)
-        hasher = self.app.csp.get_hash(csp.sha256.HashOpts())
-        for pem_serialized in data['certificates']:
-            cert = x509.load_pem_x509_certificate(pem_serialized.encode('utf8'), backend=default_backend())
-            not_valid_before = cert.not_valid_before.replace(tzinfo=timezone.utc)
-            not_valid_after = cert.not_valid_after.replace(tzinfo=timezone.utc)
-            certs.append(asdict(
-                CertEntity(sn=bytes.fromhex('{0:040X}'.format(cert.serial_number)), name=cert.subject.rfc4514_string(),
-                           public_key=bytes(self.app.csp.key_import(cert.public_key())), pem_serialized=pem_serialized,
-                           not_valid_before=not_valid_before, not_valid_after=not_valid_after)))
-            hasher.write(pem_serialized.encode('utf8'))
-        if certs:
-            insert_stmt = insert(t.cert_entities)
-            await self.connection.execute(insert_stmt, certs)
-        return hasher.sum()
+        insert_stmt = insert(t.cert_entities)
 
+        async def insert_rows(rows: list[tuple['CertEntity', CertRecord]]):
+            await self.connection.execute(insert_stmt, [entity.to_row() for entity, _ in rows])
+            for entity, record in rows:
+                self.app.index.add(record)
+                if record.ca:
+                    self.app.paths.add(record.sn, entity.certificate)
+                self.app.tree.update(record.sn, state.cert_value(entity.der_serialized))
+
+        try:
+            count = await genesis.ingest(genesis.iter_certificates(genesis_data), insert_rows)
+        except BaseException:
+            await self.abort_transaction()
+            raise
+        self.app.logger.info(f'Loaded {count} certificates from genesis')
+        return self.app.tree.sum()
+
+    @metrics.timed(metrics.HANDLER_SECONDS.labels('begin_block'))
     async def begin_block(self, req):
-        await self.begin_transaction()
+        await self.app.ready()
+        self.buffer.clear()
+        self.block_txs = 0
+        self.delivered.clear()
+        self.begin_changes()
+        self.block_time = req.header.time
         return await super().begin_block(req)
 
+    @metrics.timed(metrics.HANDLER_SECONDS.labels('end_block'))
+    async def end_block(self, req):
+        metrics.BLOCK_TXS.observe(self.block_txs)
+        return await super().end_block(req)
+
+    @metrics.timed(metrics.HANDLER_SECONDS.labels('commit'))
     async def commit(self, req):
         resp = await super().commit(req)
-        app_hash = resp.data
+        resp.data = self.app.tree.sum()
         block_height = self.block_height
         if block_height == self.app.state.block_height:
-            insert_stmt = insert(t.app_state)
-            await self.connection.execute(insert_stmt, dict(app_hash=app_hash, block_height=block_height,
-                                                            created_at=datetime.now(timezone.utc)))
+            self.buffer.set_app_state(block_height, resp.data, datetime.now(timezone.utc))
+        await self.begin_transaction()
         await self.end_transaction()
+        self.app.mempool.commit(self.delivered)
+        await self.app.archive.commit(self.block_time or datetime.now(timezone.utc))
+        await self.app.snapshots.commit(block_height)
         return resp
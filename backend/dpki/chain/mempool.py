@@ -0,0 +1,69 @@
+from typing import Iterable
+
+import csp.sha256
+from .tx import IssueTx, Tx, TxCode, TxError
+from .utils import LRUCache
+
+SEEN_SIZE = 100_000
+
+
+class MempoolFilter:
+    """ Rejects transactions which repeat recently committed or pending ones.
+
+    Digests of transactions committed in recent blocks are kept in LRU cache with `seen_size` items at most.
+    Operations accepted by CheckTx but not yet committed are kept by serial number, so the second issue of
+    pending certificate or revocation of certificate which revocation is pending is rejected before
+    validation. Pending operations are dropped on commit, Tendermint rechecks transactions left in mempool
+    and they are added again.
+    """
+
+    def __init__(self, seen_size: int = SEEN_SIZE):
+        self.committed = LRUCache(seen_size)
+        self.pending = dict()  # type: dict[bytes, tuple[type, bytes]]
+        self.digests = set()  # type: set[bytes]
+
+    def check_data(self, data: bytes) -> bytes:
+        """ Checks transaction data against digests of committed and pending transactions
+
+        Returns:
+            Digest of transaction.
+
+        Raises:
+            TxError: If transaction is already committed or pending.
+        """
+        digest = csp.sha256.digest(data)
+        if digest in self.digests:
+            raise TxError(TxCode.Duplicate, 'Transaction is already in mempool')
+        if digest in self.committed:
+            raise TxError(TxCode.Duplicate, 'Transaction has already been committed')
+        return digest
+
+    def check(self, tx: Tx):
+        """ Checks operation of transaction against pending ones
+
+        Raises:
+            TxError: If operation with the same certificate is pending.
+        """
+        pending = self.pending.get(tx.sn)
+        if pending is None or pending[0] is not type(tx):
+            return
+        if isinstance(tx, IssueTx):
+            raise TxError(TxCode.AlreadyExists, f'Certificate `{tx.sn.hex()}` is already pending')
+        raise TxError(TxCode.AlreadyRevoked, f'Revocation of certificate `{tx.sn.hex()}` is already pending')
+
+    def add(self, tx: Tx):
+        """ Registers accepted transaction as pending """
+        self.pending[tx.sn] = (type(tx), tx.hash)
+        self.digests.add(tx.hash)
+
+    def commit(self, digests: 'Iterable[bytes]'):
+        """ Drops pending operations and remembers digests of transactions committed in block """
+        self.pending.clear()
+        self.digests.clear()
+        for digest in digests:
+            self.committed.put(digest, True)
+
+    def clear(self):
+        self.pending.clear()
+        self.digests.clear()
+        self.committed.clear()
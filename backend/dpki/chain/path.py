@@ -0,0 +1,228 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from cryptography import x509
+from sqlalchemy import select
+
+from csp import ed25519
+from dpki import database as t
+from .index import CertRecord
+from .tx import TxCode, TxError
+from .utils import LRUCache
+
+if TYPE_CHECKING:
+    from . import Application
+
+CACHE_SIZE = 10_000
+
+CERT_SIGNER_OPTS = ed25519.SignerOpts()
+
+
+def is_ca(cert: x509.Certificate) -> bool:
+    """ True if certificate belongs to certificate authority which can sign certificates """
+    try:
+        if not cert.extensions.get_extension_for_class(x509.BasicConstraints).value.ca:
+            return False
+    except x509.ExtensionNotFound:
+        return False
+    try:
+        return cert.extensions.get_extension_for_class(x509.KeyUsage).value.key_cert_sign
+    except x509.ExtensionNotFound:
+        return True
+
+
+def path_length(cert: x509.Certificate) -> float:
+    """ Count of intermediate CAs allowed below certificate authority, `math.inf` if not limited """
+    value = cert.extensions.get_extension_for_class(x509.BasicConstraints).value.path_length
+    return math.inf if value is None else value
+
+
+def check_usage(cert: x509.Certificate):
+    """ Checks that BasicConstraints and KeyUsage of certificate are consistent as templates make them
+
+    Raises:
+        TxError: If certificate extensions are missing or inconsistent.
+    """
+    try:
+        constraints = cert.extensions.get_extension_for_class(x509.BasicConstraints).value
+        usage = cert.extensions.get_extension_for_class(x509.KeyUsage).value
+    except x509.ExtensionNotFound as exc:
+        raise TxError(TxCode.BadCertificate, str(exc))
+    if constraints.ca != usage.key_cert_sign:
+        raise TxError(TxCode.BadCertificate, 'Key usage does not match basic constraints of certificate')
+    if not constraints.ca and constraints.path_length is not None:
+        raise TxError(TxCode.BadCertificate, 'Path length is set for end entity certificate')
+
+
+@dataclass(frozen=True)
+class Path:
+    """ Validated path from certificate authority to trust anchor
+
+    Attributes:
+        serials: Serial numbers of CAs from the first one to trust anchor.
+        slack: Count of intermediate CAs allowed below the first one.
+        not_valid_before: Path is valid from this date (naive UTC).
+        not_valid_after: Path is valid till this date (naive UTC).
+    """
+    serials: tuple[bytes, ...]
+    slack: float
+    not_valid_before: datetime
+    not_valid_after: datetime
+
+    def is_valid(self, now: datetime) -> bool:
+        return self.not_valid_before <= now <= self.not_valid_after
+
+
+class PathValidator:
+    """ Builds and validates certificate paths from issuer to trust anchor.
+
+    Trust anchors are self-signed CAs registered in genesis. Validated paths are cached by the first CA,
+    so validating another certificate under the same CA costs one signature check. Cached paths are dropped
+    by `invalidate` when any CA on them is revoked. Certificates registered by `add` are kept until they are
+    committed to database, only committed ones go to LRU cache.
+    """
+
+    def __init__(self, app: 'Application', cache_size: int = CACHE_SIZE):
+        self.app = app
+        self.cache_size = cache_size
+        self.certificates = LRUCache(cache_size)
+        self.__uncommitted = dict()  # type: dict[bytes, x509.Certificate]
+        self.__paths = dict()  # type: dict[bytes, Path]
+        self.__dependents = dict()  # type: dict[bytes, set[bytes]]
+
+    def add(self, sn: bytes, cert: x509.Certificate):
+        """ Registers certificate which is not yet committed to database """
+        self.__uncommitted[sn] = cert
+
+    def commit(self):
+        """ Moves CA certificates registered by `add` to cache after they have been committed to database """
+        for sn, cert in self.__uncommitted.items():
+            if is_ca(cert):
+                self.certificates.put(sn, cert)
+        self.__uncommitted.clear()
+
+    def rollback(self):
+        """ Drops certificates registered by `add` and paths which could be built through them """
+        self.__uncommitted.clear()
+        self.clear()
+
+    def invalidate(self, sn: bytes):
+        """ Drops cached paths containing certificate `sn` """
+        for first in self.__dependents.pop(sn, ()):
+            self.__paths.pop(first, None)
+
+    def clear(self):
+        self.__paths.clear()
+        self.__dependents.clear()
+
+    async def certificate(self, record: CertRecord) -> x509.Certificate:
+        """ Returns certificate of record """
+        cert = self.__uncommitted.get(record.sn) or self.certificates.get(record.sn)
+        if cert is None:
+            async with self.app.reader.connect() as connection:
+                for table in (t.cert_entities, t.cert_entities_archive):
+                    select_stmt = select(table.c.der_serialized).where(table.c.sn == record.sn)
+                    der_serialized = (await connection.execute(select_stmt)).scalar_one_or_none()
+                    if der_serialized is not None:
+                        break
+                else:
+                    raise LookupError(f'Certificate `{record.sn.hex()}` not found')
+            cert = x509.load_der_x509_certificate(der_serialized)
+            if is_ca(cert):
+                self.certificates.put(record.sn, cert)
+        return cert
+
+    async def resolve(self, record: CertRecord):
+        """ Fills attributes of record loaded into index from database with data of certificate itself """
+        cert = await self.certificate(record)
+        record.issuer = cert.issuer.rfc4514_string()
+        record.ca = is_ca(cert)
+
+    async def validate(self, cert: x509.Certificate, now: datetime, signatures: dict[bytes, bool] = None) -> bytes:
+        """ Validates certificate at moment `now` (naive UTC) and returns serial number of its issuer.
+
+        All issuers with matching name are validated against current state. `signatures` keeps results of
+        signature checks of certificate by keys of issuers with these serial numbers, they are reused and
+        new results are added to it.
+
+        Raises:
+            TxError: If certificate or path to trust anchor is not valid.
+        """
+        check_usage(cert)
+        if not cert.not_valid_before <= now <= cert.not_valid_after:
+            raise TxError(TxCode.Expired, 'Certificate is not valid at this moment')
+        issuer_name = cert.issuer.rfc4514_string()
+        issuers = self.app.index.find_by_name(issuer_name)
+        if not issuers:
+            raise TxError(TxCode.UnknownIssuer, f'Issuer `{issuer_name}` not found')
+        signatures = dict() if signatures is None else signatures
+        error = TxError(TxCode.InvalidIssuer, f'Issuer `{issuer_name}` is not valid')
+        for record in issuers:
+            try:
+                await self.path(record, now)
+            except TxError as exc:
+                error = exc
+                continue
+            valid = signatures.get(record.sn)
+            if valid is None:
+                valid = signatures[record.sn] = self.verify(record.public_key, cert)
+            if valid:
+                return record.sn
+            error = TxError(TxCode.BadSignature, 'Certificate signature is not valid')
+        raise error
+
+    async def path(self, record: CertRecord, now: datetime, seen: frozenset = frozenset()) -> Path:
+        """ Returns validated path from CA `record` to trust anchor at moment `now` (naive UTC)
+
+        Raises:
+            TxError: If there is no valid path.
+        """
+        path = self.__paths.get(record.sn)
+        if path is not None and path.is_valid(now):
+            return path
+        if record.sn in seen:
+            raise TxError(TxCode.InvalidIssuer, f'Issuer `{record.name}` is in loop of issuers')
+        if not record.is_valid(now):
+            raise TxError(TxCode.InvalidIssuer, f'Issuer `{record.name}` is not valid')
+        if record.ca is None:
+            await self.resolve(record)
+        if not record.ca:
+            raise TxError(TxCode.InvalidIssuer, f'Issuer `{record.name}` is not certificate authority')
+        cert = await self.certificate(record)
+        if record.issuer == record.name:
+            path = Path((record.sn,), path_length(cert), record.not_valid_before, record.not_valid_after)
+        else:
+            path = await self._extend(record, cert, now, seen | {record.sn})
+        if len(self.__paths) >= self.cache_size:
+            self.clear()
+        self.__paths[record.sn] = path
+        for sn in path.serials:
+            self.__dependents.setdefault(sn, set()).add(record.sn)
+        return path
+
+    async def _extend(self, record: CertRecord, cert: x509.Certificate, now: datetime, seen: frozenset) -> Path:
+        """ Finds valid path of issuer and extends it with intermediate CA `record` """
+        error = TxError(TxCode.InvalidIssuer, f'Issuer `{record.issuer}` of `{record.name}` not found')
+        for parent in self.app.index.find_by_name(record.issuer):
+            try:
+                parent_path = await self.path(parent, now, seen)
+            except TxError as exc:
+                error = exc
+                continue
+            if parent_path.slack < 1:
+                error = TxError(TxCode.InvalidIssuer, f'Path length of issuer `{parent.name}` is exceeded')
+                continue
+            if not self.verify(parent.public_key, cert):
+                error = TxError(TxCode.BadSignature, f'Signature of issuer `{record.name}` is not valid')
+                continue
+            return Path((record.sn, *parent_path.serials), min(path_length(cert), parent_path.slack - 1),
+                        max(record.not_valid_before, parent_path.not_valid_before),
+                        min(record.not_valid_after, parent_path.not_valid_after))
+        raise error
+
+    def verify(self, public_key: bytes, cert: x509.Certificate) -> bool:
+        """ True if certificate is signed by key `public_key` """
+        pub = self.app.csp.key_import(public_key, ed25519.PUBLIC_OPTS)
+        return self.app.csp.verify(pub, cert.signature, cert.tbs_certificate_bytes, CERT_SIGNER_OPTS)
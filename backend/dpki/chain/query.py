@@ -0,0 +1,210 @@
+import json
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import and_, bindparam, desc, select
+from tend.abci.handlers import ResultCode, ResponseQuery
+
+from dpki import database as t
+from .tx import TxCode
+from .utils import JSONEncoder, LRUCache, utc_naive
+from ..models import CertEntity
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from . import Application
+
+CACHE_SIZE = 100_000
+CACHE_TTL = 60.0
+
+_MISSING = object()
+
+# Certificates with `serials` and height of the last block, they are read by one statement to be consistent
+_latest = select(t.app_state.c.block_height).order_by(desc(t.app_state.c.block_height)).limit(1).subquery()
+_SELECT_CERTS = select(_latest.c.block_height, t.cert_entities).select_from(
+    _latest.outerjoin(t.cert_entities, t.cert_entities.c.sn.in_(bindparam('serials', expanding=True))))
+# Slower path for certificates which are not found, they may have been archived
+_SELECT_ARCHIVED = select(t.cert_entities_archive).where(
+    t.cert_entities_archive.c.sn.in_(bindparam('serials', expanding=True)))
+
+# Lookups answered by covering indexes of `cert_entities` alone, with height of the last block
+_c = t.cert_entities.c
+_not_revoked_at = and_(_c.revocated_at.is_(None), _c.not_valid_before <= bindparam('at'),
+                       _c.not_valid_after >= bindparam('at'))
+_SELECT_VALID_BY_NAME = select(_latest.c.block_height, _c.sn).select_from(
+    _latest.outerjoin(t.cert_entities, and_(_c.name == bindparam('name'), _not_revoked_at)))
+_SELECT_LIVE_BY_PUBLIC_KEY = select(_latest.c.block_height, _c.sn).select_from(
+    _latest.outerjoin(t.cert_entities, and_(_c.public_key == bindparam('public_key'), _not_revoked_at)))
+_SELECT_REVOKED_SINCE = select(_latest.c.block_height, _c.sn, _c.revocated_at).select_from(
+    _latest.outerjoin(t.cert_entities, and_(_c.revocated_at.isnot(None), _c.revocated_at >= bindparam('since')))) \
+    .order_by(_c.revocated_at, _c.sn)
+
+
+def cert_status(entity: CertEntity, now: datetime) -> dict:
+    """ Status of certificate at moment `now` (naive UTC) """
+    not_valid_before, not_valid_after = utc_naive(entity.not_valid_before), utc_naive(entity.not_valid_after)
+    return dict(sn=entity.sn.hex(), name=entity.name, public_key=entity.public_key.hex(),
+                not_valid_before=not_valid_before, not_valid_after=not_valid_after,
+                revocated_at=entity.revocated_at,
+                valid=entity.revocated_at is None and not_valid_before <= now <= not_valid_after)
+
+
+class QueryHandler:
+    """ Handles ABCI queries about certificates status.
+
+    Paths:
+        /cert/sn: `data` is serial number (raw or hex), responds with status of certificate.
+        /cert/pem: `data` is serial number (raw or hex), responds with PEM serialized certificate.
+        /cert/name: `data` is distinguished name, responds with list of certificates' status.
+        /cert/public_key: `data` is raw public key, responds with list of certificates' status.
+        /cert/valid: `data` is distinguished name, responds with list of status of certificates valid now.
+        /cert/live: `data` is raw public key, responds with list of status of certificates valid now.
+        /revocations/full: `data` is block height (decimal, the last one if empty), responds with encoded
+            full `RevocationList` at this height.
+        /revocations/delta: `data` is base block height (decimal), responds with encoded delta `RevocationList`
+            from base height to the last block.
+        /revocations/since: `data` is ISO 8601 time (UTC if naive), responds with list of serial number (hex)
+            and revocation time of certificates revoked since this time.
+
+    Database is read through read-only engine with one statement per query, which also reads block height
+    of the last `app_state` row, so response is consistent with this height, it is returned as `height`.
+    Certificates are cached by serial number for the last committed height, cache is invalidated on commit
+    for serials changed in block. Certificates which are not found are looked up in archive by the second
+    statement. Valid certificates by name or public key and revocations by time are looked up in database by
+    covering indexes, these lookups see certificates which have not been archived only.
+    """
+
+    def __init__(self, app: 'Application', cache_size: int = CACHE_SIZE, cache_ttl: float = CACHE_TTL):
+        self.app = app
+        self.cache = LRUCache(cache_size, cache_ttl)
+        self.__height = 0
+
+    @property
+    def height(self) -> int:
+        """ Block height which cache is consistent with """
+        return self.__height
+
+    def invalidate(self, serials: Iterable[bytes], height: int):
+        """ Drops certificates with `serials` from cache after commit of block `height` """
+        self.__height = height
+        for sn in serials:
+            self.cache.pop(sn)
+
+    async def get(self, serials: list[bytes]) -> tuple[int, list['Optional[CertEntity]']]:
+        """ Returns block height and certificate entities by serial numbers at this height """
+        height = self.__height
+        result = [self.cache.get(sn, _MISSING) for sn in serials]
+        if _MISSING not in result:
+            return height, result
+        # Cached certificates are requested too, they are used if commit has happened in between
+        read_height, found = 0, dict()
+        async with self.app.reader.connect() as connection:
+            for row in await connection.execute(_SELECT_CERTS, dict(serials=list(set(serials)))):
+                read_height = row.block_height
+                if row.sn is not None:
+                    found[row.sn] = row
+            missing = list({sn for sn in serials if sn not in found})
+            if missing:
+                for row in await connection.execute(_SELECT_ARCHIVED, dict(serials=missing)):
+                    found[row.sn] = row
+        if read_height != height:
+            result = [_MISSING] * len(serials)
+        # Nothing is cached before the first commit, serials of genesis are not invalidated on it
+        cache = read_height != 0 and read_height == self.__height
+        for pos, sn in enumerate(serials):
+            if result[pos] is _MISSING:
+                result[pos] = CertEntity.from_row(found[sn]) if sn in found else None
+                if cache:
+                    self.cache.put(sn, result[pos])
+        return read_height, result
+
+    async def find_valid(self, name: str, at: datetime) -> tuple[int, list[bytes]]:
+        """ Returns block height and serial numbers of certificates of subject `name` valid at `at` at this height """
+        return await self._find(_SELECT_VALID_BY_NAME, dict(name=name, at=utc_naive(at)))
+
+    async def find_live(self, public_key: bytes, at: datetime) -> tuple[int, list[bytes]]:
+        """ Returns block height and serial numbers of certificates with `public_key` valid at `at` at this height """
+        return await self._find(_SELECT_LIVE_BY_PUBLIC_KEY, dict(public_key=public_key, at=utc_naive(at)))
+
+    async def revoked_since(self, since: datetime) -> tuple[int, list[tuple[bytes, datetime]]]:
+        """ Returns block height and serial numbers with revocation time of certificates revoked since `since`
+        at this height, ordered by revocation time
+        """
+        async with self.app.reader.connect() as connection:
+            rows = (await connection.execute(_SELECT_REVOKED_SINCE, dict(since=utc_naive(since)))).all()
+        return rows[0].block_height if rows else 0, [(row.sn, row.revocated_at) for row in rows if row.sn is not None]
+
+    async def _find(self, select_stmt, params: dict) -> tuple[int, list[bytes]]:
+        async with self.app.reader.connect() as connection:
+            rows = (await connection.execute(select_stmt, params)).all()
+        return rows[0].block_height if rows else 0, [row.sn for row in rows if row.sn is not None]
+
+    async def query(self, req) -> ResponseQuery:
+        now = utc_naive(datetime.now(timezone.utc))
+        data = bytes(req.data)
+        if req.path in ('/cert/sn', '/cert/pem'):
+            try:
+                sn = bytes.fromhex(data.decode('ascii')) if len(data) == 40 else data
+            except ValueError:
+                return ResponseQuery(code=TxCode.BadEncoding, log='Bad serial number', height=self.__height)
+            height, (entity,) = await self.get([sn])
+            if entity is None:
+                return ResponseQuery(code=TxCode.NotFound, log='Certificate not found', key=sn, height=height)
+            if req.path == '/cert/pem':
+                return ResponseQuery(code=ResultCode.OK, key=sn, value=entity.to_pem().encode('utf8'), height=height)
+            return ResponseQuery(code=ResultCode.OK, key=sn, value=_dumps(cert_status(entity, now)), height=height)
+        elif req.path == '/cert/name':
+            try:
+                name = data.decode('utf8')
+            except ValueError:
+                return ResponseQuery(code=TxCode.BadEncoding, log='Bad name', height=self.__height)
+            serials = [record.sn for record in self.app.index.find_by_name(name)]
+        elif req.path == '/cert/public_key':
+            serials = [record.sn for record in self.app.index.find_by_public_key(data)]
+        elif req.path == '/cert/valid':
+            try:
+                name = data.decode('utf8')
+            except ValueError:
+                return ResponseQuery(code=TxCode.BadEncoding, log='Bad name', height=self.__height)
+            _, serials = await self.find_valid(name, now)
+        elif req.path == '/cert/live':
+            _, serials = await self.find_live(data, now)
+        elif req.path in ('/revocations/full', '/revocations/delta'):
+            return self.revocations(req.path, data)
+        elif req.path == '/revocations/since':
+            try:
+                since = datetime.fromisoformat(data.decode('ascii'))
+            except ValueError:
+                return ResponseQuery(code=TxCode.BadEncoding, log='Bad time', height=self.__height)
+            height, revoked = await self.revoked_since(since)
+            result = [dict(sn=sn.hex(), revocated_at=revocated_at) for sn, revocated_at in revoked]
+            return ResponseQuery(code=ResultCode.OK, key=data, value=_dumps(result), height=height)
+        else:
+            return ResponseQuery(code=TxCode.UnknownOperation, log=f'Unknown path `{req.path}`',
+                                 height=self.__height)
+        # Index may contain certificates of block being delivered, they are not found in database yet
+        height, entities = await self.get(serials)
+        result = [cert_status(entity, now) for entity in entities if entity]
+        return ResponseQuery(code=ResultCode.OK, key=data, value=_dumps(result), height=height)
+
+    def revocations(self, path: str, data: bytes) -> ResponseQuery:
+        revocations = self.app.revocations
+        try:
+            height = int(data) if data else None
+        except ValueError:
+            return ResponseQuery(code=TxCode.BadEncoding, log='Bad block height', height=revocations.height)
+        try:
+            if path == '/revocations/full':
+                result = revocations.full(height)
+            elif height is None:
+                return ResponseQuery(code=TxCode.BadEncoding, log='Base block height is required',
+                                     height=revocations.height)
+            else:
+                result = revocations.delta(height)
+        except ValueError as exc:
+            return ResponseQuery(code=TxCode.NotFound, log=str(exc), height=revocations.height)
+        return ResponseQuery(code=ResultCode.OK, key=data, value=result.encode(), height=result.height)
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, cls=JSONEncoder).encode('utf8')
@@ -0,0 +1,152 @@
+import struct
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Iterable, Iterator
+
+SN_SIZE = 20
+LOG_SIZE = 100_000
+
+MAGIC = b'DPKR'
+VERSION = 1
+HEADER = struct.Struct('>4sBBQQI')
+
+
+class ListKind(IntEnum):
+    Full = 0
+    Delta = 1
+
+
+@dataclass(frozen=True)
+class RevocationList:
+    """ CRL-style list of revoked serial numbers
+
+    Attributes:
+        kind: Full list or delta.
+        base_height: Block height which delta is based on, 0 for full list.
+        height: Block height of list.
+        serials: Sorted serial numbers.
+    """
+    kind: ListKind
+    base_height: int
+    height: int
+    serials: tuple[bytes, ...]
+
+    def encode(self) -> bytes:
+        """ Header followed by serial numbers of `SN_SIZE` bytes each """
+        return HEADER.pack(MAGIC, VERSION, self.kind, self.base_height, self.height, len(self.serials)) + \
+            b''.join(self.serials)
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'RevocationList':
+        """ Decodes revocation list
+
+        Raises:
+            ValueError: If data is not encoded revocation list.
+        """
+        if len(data) < HEADER.size:
+            raise ValueError('Revocation list is too short')
+        magic, version, kind, base_height, height, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Unknown format of revocation list')
+        if len(data) != HEADER.size + count * SN_SIZE:
+            raise ValueError('Bad size of revocation list')
+        view = memoryview(data)[HEADER.size:]
+        return cls(ListKind(kind), base_height, height,
+                   tuple(bytes(view[pos:pos + SN_SIZE]) for pos in range(0, len(view), SN_SIZE)))
+
+
+class RevocationSet:
+    """ Compact set of revoked serial numbers with log of per-block deltas.
+
+    Serial numbers are kept sorted in one byte array of `SN_SIZE` byte records. Deltas of the last
+    `log_size` blocks with revocations are kept to export lists at past heights and deltas between heights.
+    """
+
+    def __init__(self, log_size: int = LOG_SIZE):
+        self.log_size = log_size
+        self.height = 0
+        self.__data = bytearray()
+        self.__log = deque()  # type: deque[tuple[int, tuple[bytes, ...]]]
+        self.__log_height = 0
+
+    def __len__(self):
+        return len(self.__data) // SN_SIZE
+
+    def __iter__(self) -> Iterator[bytes]:
+        data = bytes(self.__data)
+        return (data[pos:pos + SN_SIZE] for pos in range(0, len(data), SN_SIZE))
+
+    def __contains__(self, sn: bytes) -> bool:
+        pos = self._find(sn)
+        return self.__data[pos:pos + SN_SIZE] == sn
+
+    def reset(self, serials: Iterable[bytes], height: int):
+        """ Replaces set with `serials` revoked at `height`, log of deltas starts from this height """
+        self.__data = bytearray(b''.join(sorted(serials)))
+        self.__log = deque()
+        self.__log_height = self.height = height
+
+    def add_block(self, height: int, serials: Iterable[bytes]):
+        """ Adds serial numbers revoked in committed block `height` """
+        added = []
+        for sn in sorted(serials):
+            pos = self._find(sn)
+            if self.__data[pos:pos + SN_SIZE] != sn:
+                self.__data[pos:pos] = sn
+                added.append(sn)
+        if added:
+            self.__log.append((height, tuple(added)))
+            if len(self.__log) > self.log_size:
+                self.__log_height = self.__log.popleft()[0]
+        self.height = height
+
+    def full(self, height: int = None) -> RevocationList:
+        """ Full revocation list at block `height`, the last committed one by default
+
+        Raises:
+            ValueError: If height is out of range of log.
+        """
+        height = self._check_height(height)
+        serials = tuple(self)
+        if height != self.height:
+            later = set(self._changes(height, self.height))
+            serials = tuple(sn for sn in serials if sn not in later)
+        return RevocationList(ListKind.Full, 0, height, serials)
+
+    def delta(self, base_height: int, height: int = None) -> RevocationList:
+        """ Serial numbers revoked after block `base_height` till block `height` inclusive
+
+        Raises:
+            ValueError: If heights are out of range of log.
+        """
+        height = self._check_height(height)
+        if not self.__log_height <= base_height <= height:
+            raise ValueError(f'Base height {base_height} is out of range {self.__log_height}..{height}')
+        return RevocationList(ListKind.Delta, base_height, height, tuple(sorted(self._changes(base_height, height))))
+
+    def _changes(self, base_height: int, height: int) -> Iterator[bytes]:
+        for block_height, serials in reversed(self.__log):
+            if block_height <= base_height:
+                break
+            if block_height <= height:
+                yield from serials
+
+    def _check_height(self, height: 'int | None') -> int:
+        if height is None:
+            return self.height
+        if not self.__log_height <= height <= self.height:
+            raise ValueError(f'Height {height} is out of range {self.__log_height}..{self.height}')
+        return height
+
+    def _find(self, sn: bytes) -> int:
+        """ Position of the first record which is not less than `sn` """
+        data = self.__data
+        low, high = 0, len(data) // SN_SIZE
+        while low < high:
+            middle = (low + high) // 2
+            if data[middle * SN_SIZE:(middle + 1) * SN_SIZE] < sn:
+                low = middle + 1
+            else:
+                high = middle
+        return low * SN_SIZE
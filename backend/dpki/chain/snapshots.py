@@ -0,0 +1,351 @@
+import asyncio
+import json
+import os
+import shutil
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from typing import TYPE_CHECKING, Iterator
+
+from sqlalchemy import delete, insert, select
+from tend.abci.handlers import ResponseApplySnapshotChunk, ResponseListSnapshots, ResponseLoadSnapshotChunk, \
+    ResponseOfferSnapshot, Snapshot
+
+import csp.sha256
+from dpki import database as t
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from sqlalchemy.ext.asyncio import AsyncConnection
+    from . import Application
+
+FORMAT = 1
+CHUNK_SIZE = 4 << 20
+KEEP_RECENT = 2
+
+KIND_CERT = 0
+KIND_APP_STATE = 1
+
+HEADER = struct.Struct('>BH')
+LENGTH = struct.Struct('>I')
+NULL = 0xFFFFFFFF
+
+CERT_COLUMNS = ('sn', 'name', 'public_key', 'der_serialized', 'not_valid_after', 'not_valid_before', 'revocated_at')
+APP_STATE_COLUMNS = ('created_at', 'block_height', 'app_hash')
+
+
+class OfferResult(IntEnum):
+    """ Values of `ResponseOfferSnapshot.result` """
+    Unknown = 0
+    Accept = 1
+    Abort = 2
+    Reject = 3
+    RejectFormat = 4
+    RejectSender = 5
+
+
+class ApplyResult(IntEnum):
+    """ Values of `ResponseApplySnapshotChunk.result` """
+    Unknown = 0
+    Accept = 1
+    Abort = 2
+    Retry = 3
+    RetrySnapshot = 4
+    RejectSnapshot = 5
+
+
+def _to_bytes(value) -> 'Optional[bytes]':
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat().encode('ascii')
+    return str(value).encode('utf8')
+
+
+CONVERTERS = dict(name=lambda value: value.decode('utf8'),
+                  not_valid_after=lambda value: datetime.fromisoformat(value.decode('ascii')),
+                  not_valid_before=lambda value: datetime.fromisoformat(value.decode('ascii')),
+                  revocated_at=lambda value: datetime.fromisoformat(value.decode('ascii')),
+                  created_at=lambda value: datetime.fromisoformat(value.decode('ascii')),
+                  block_height=int)
+
+
+def pack_record(kind: int, values: tuple) -> bytes:
+    """ Packs row as kind, count of values and values prefixed with their length """
+    parts = [HEADER.pack(kind, len(values))]
+    for value in map(_to_bytes, values):
+        if value is None:
+            parts.append(LENGTH.pack(NULL))
+        else:
+            parts.append(LENGTH.pack(len(value)))
+            parts.append(value)
+    return b''.join(parts)
+
+
+def unpack_records(data: bytes) -> Iterator[tuple[int, list['Optional[bytes]']]]:
+    """ Unpacks rows packed by `pack_record`
+
+    Raises:
+        ValueError: If data is malformed.
+    """
+    view, pos = memoryview(data), 0
+    try:
+        while pos < len(view):
+            kind, count = HEADER.unpack_from(view, pos)
+            pos += HEADER.size
+            values = []
+            for _ in range(count):
+                size, = LENGTH.unpack_from(view, pos)
+                pos += LENGTH.size
+                if size == NULL:
+                    values.append(None)
+                else:
+                    if pos + size > len(view):
+                        raise ValueError('Record is truncated')
+                    values.append(bytes(view[pos:pos + size]))
+                    pos += size
+            yield kind, values
+    except struct.error as exc:
+        raise ValueError(str(exc))
+
+
+def make_row(columns: tuple[str, ...], values: list['Optional[bytes]']) -> dict:
+    if len(columns) != len(values):
+        raise ValueError('Unexpected count of values in record')
+    return {column: value if value is None or column not in CONVERTERS else CONVERTERS[column](value)
+            for column, value in zip(columns, values)}
+
+
+@dataclass
+class Restore:
+    """ Snapshot being restored
+
+    Attributes:
+        snapshot: Offered snapshot.
+        hashes: Hashes of chunks from snapshot metadata.
+        app_hash: Trusted app hash at height of snapshot.
+        applied: Count of applied chunks.
+    """
+    snapshot: Snapshot
+    hashes: list[bytes]
+    app_hash: bytes
+    applied: int = 0
+
+
+class SnapshotStore:
+    """ Snapshots of `cert_entities` and `app_state` for state sync.
+
+    Snapshot is taken after commit of block which height is multiple of `interval`: read transaction is started
+    in Commit, so snapshot is of committed state at this height, while rows are read, compressed and written
+    by background task, compression and file I/O run in thread pool. Snapshot is a directory with compressed
+    chunks of packed rows and `metadata.json`. Snapshot metadata is JSON list of hex encoded
+    SHA256 hashes of chunks, snapshot hash is hash of concatenated chunk hashes.
+    """
+
+    def __init__(self, app: 'Application', path: str = None, interval: int = None,
+                 keep_recent: int = KEEP_RECENT, chunk_size: int = CHUNK_SIZE):
+        self.app = app
+        self.path = path or os.environ.get('SNAPSHOT_PATH', os.path.join('.data', 'snapshots'))
+        self.interval = int(os.environ.get('SNAPSHOT_INTERVAL', 0)) if interval is None else interval
+        self.keep_recent = keep_recent
+        self.chunk_size = chunk_size
+        self.restore = None  # type: Optional[Restore]
+        self.taking = None  # type: Optional[asyncio.Task]
+
+    def _snapshot_path(self, height: int, format_: int = FORMAT) -> str:
+        return os.path.join(self.path, f'{height:012d}.{format_}')
+
+    def snapshots(self) -> list[Snapshot]:
+        """ Snapshots available on disk, the most recent first """
+        result = []
+        if os.path.isdir(self.path):
+            for name in sorted(os.listdir(self.path), reverse=True):
+                if name.endswith('.tmp'):
+                    continue
+                try:
+                    with open(os.path.join(self.path, name, 'metadata.json')) as file:
+                        obj = json.load(file)
+                except (OSError, ValueError):
+                    continue
+                result.append(Snapshot(height=obj['height'], format=obj['format'], chunks=obj['chunks'],
+                                       hash=bytes.fromhex(obj['hash']), metadata=obj['metadata'].encode('ascii')))
+        return result
+
+    async def pin(self, height: int) -> 'AsyncConnection':
+        """ Returns read-only connection in transaction which reads committed state at block `height`
+
+        Raises:
+            RuntimeError: If the last committed block is not `height`.
+        """
+        from . import SELECT_LATEST
+        connection = await self.app.reader.connect().start()
+        try:
+            if connection.dialect.name == 'sqlite':
+                # SQLite driver does not begin transaction before SELECT, so read snapshot is started explicitly
+                await connection.exec_driver_sql('BEGIN')
+            row = (await connection.execute(SELECT_LATEST)).one_or_none()
+            if row is None or row.block_height != height:
+                raise RuntimeError(f'Committed block height is not {height}')
+        except BaseException:
+            await connection.close()
+            raise
+        return connection
+
+    async def take(self, height: int, connection: 'AsyncConnection' = None):
+        """ Writes snapshot of committed state at block `height`, reads it by `connection` returned by `pin`
+        if it is given and closes this connection
+        """
+        loop = asyncio.get_running_loop()
+        target = self._snapshot_path(height)
+        temp = target + '.tmp'
+        hashes, parts, size = [], [], 0
+
+        def prepare():
+            shutil.rmtree(temp, ignore_errors=True)
+            os.makedirs(temp)
+
+        def write_chunk(index: int, data: bytes) -> bytes:
+            chunk = zlib.compress(data)
+            with open(os.path.join(temp, f'{index:06d}.chunk'), 'wb') as file:
+                file.write(chunk)
+            return csp.sha256.digest(chunk)
+
+        def finish():
+            metadata = json.dumps([item.hex() for item in hashes])
+            with open(os.path.join(temp, 'metadata.json'), 'w') as file:
+                json.dump(dict(height=height, format=FORMAT, chunks=len(hashes),
+                               hash=csp.sha256.digest(b''.join(hashes)).hex(), metadata=metadata), file)
+            shutil.rmtree(target, ignore_errors=True)
+            os.rename(temp, target)
+            for snapshot in self.snapshots()[self.keep_recent:]:
+                shutil.rmtree(self._snapshot_path(snapshot.height, snapshot.format), ignore_errors=True)
+
+        if connection is None:
+            connection = await self.pin(height)
+        try:
+            await loop.run_in_executor(None, prepare)
+            # Archived certificates are restored into `cert_entities`, archive is local to node
+            for kind, table, columns in ((KIND_APP_STATE, t.app_state, APP_STATE_COLUMNS),
+                                         (KIND_CERT, t.cert_entities, CERT_COLUMNS),
+                                         (KIND_CERT, t.cert_entities_archive, CERT_COLUMNS)):
+                select_stmt = select(*(table.c[column] for column in columns))
+                async for row in await connection.stream(select_stmt):
+                    record = pack_record(kind, tuple(row))
+                    parts.append(record)
+                    size += len(record)
+                    if size >= self.chunk_size:
+                        data, parts, size = b''.join(parts), [], 0
+                        hashes.append(await loop.run_in_executor(None, write_chunk, len(hashes), data))
+        finally:
+            await connection.close()
+        if parts or not hashes:
+            hashes.append(await loop.run_in_executor(None, write_chunk, len(hashes), b''.join(parts)))
+        await loop.run_in_executor(None, finish)
+
+    async def commit(self, height: int):
+        """ Starts to take snapshot in background if it is time to, snapshot is skipped if the previous one
+        is still being taken
+        """
+        if not self.interval or height % self.interval != 0:
+            return
+        if self.taking is not None and not self.taking.done():
+            self.app.logger.warning(f'Snapshot at height {height} is skipped, the previous one is being taken')
+            return
+        connection = await self.pin(height)
+        self.taking = asyncio.create_task(self._take(height, connection))
+
+    async def _take(self, height: int, connection: 'AsyncConnection'):
+        try:
+            await self.take(height, connection)
+        except Exception as exc:
+            self.app.logger.error(f'Snapshot at height {height} has failed: {exc!r}')
+            shutil.rmtree(self._snapshot_path(height) + '.tmp', ignore_errors=True)
+
+    async def close(self):
+        """ Cancels snapshot being taken """
+        if self.taking is not None and not self.taking.done():
+            self.taking.cancel()
+            try:
+                await self.taking
+            except asyncio.CancelledError:
+                pass
+
+    async def list_snapshots(self, req) -> ResponseListSnapshots:
+        return ResponseListSnapshots(snapshots=self.snapshots())
+
+    async def load_snapshot_chunk(self, req) -> ResponseLoadSnapshotChunk:
+        filename = os.path.join(self._snapshot_path(req.height, req.format), f'{req.chunk:06d}.chunk')
+        try:
+            with open(filename, 'rb') as file:
+                return ResponseLoadSnapshotChunk(chunk=file.read())
+        except OSError:
+            return ResponseLoadSnapshotChunk()
+
+    async def offer_snapshot(self, req) -> ResponseOfferSnapshot:
+        snapshot = req.snapshot
+        if snapshot.format != FORMAT:
+            return ResponseOfferSnapshot(result=OfferResult.RejectFormat)
+        try:
+            hashes = [bytes.fromhex(item) for item in json.loads(snapshot.metadata)]
+        except (ValueError, TypeError):
+            return ResponseOfferSnapshot(result=OfferResult.Reject)
+        if len(hashes) != snapshot.chunks or csp.sha256.digest(b''.join(hashes)) != snapshot.hash:
+            return ResponseOfferSnapshot(result=OfferResult.Reject)
+        await self._clear_tables()
+        self.restore = Restore(snapshot, hashes, req.app_hash)
+        return ResponseOfferSnapshot(result=OfferResult.Accept)
+
+    async def apply_snapshot_chunk(self, req) -> ResponseApplySnapshotChunk:
+        restore = self.restore
+        if restore is None:
+            return ResponseApplySnapshotChunk(result=ApplyResult.Abort)
+        if req.index != restore.applied:
+            return ResponseApplySnapshotChunk(result=ApplyResult.Retry, refetch_chunks=[restore.applied])
+        chunk = bytes(req.chunk)
+        if csp.sha256.digest(chunk) != restore.hashes[req.index]:
+            return ResponseApplySnapshotChunk(result=ApplyResult.Retry, refetch_chunks=[req.index],
+                                              reject_senders=[req.sender] if req.sender else [])
+        certs, app_states = [], []
+        try:
+            for kind, values in unpack_records(zlib.decompress(chunk)):
+                if kind == KIND_CERT:
+                    certs.append(make_row(CERT_COLUMNS, values))
+                elif kind == KIND_APP_STATE:
+                    app_states.append(make_row(APP_STATE_COLUMNS, values))
+                else:
+                    raise ValueError(f'Unknown kind of record {kind}')
+        except (ValueError, zlib.error):
+            return await self._reject()
+        async with self.app.database.begin() as connection:
+            if certs:
+                await connection.execute(insert(t.cert_entities), certs)
+            if app_states:
+                await connection.execute(insert(t.app_state), app_states)
+        restore.applied += 1
+        if restore.applied == restore.snapshot.chunks:
+            state = await self.app.get_initial_app_state()
+            try:
+                await self.app.ready()
+            except RuntimeError:
+                return await self._reject()
+            # State tree is recomputed from restored certificates, so they are checked against trusted app hash too
+            if state.block_height != restore.snapshot.height or state.app_hash != restore.app_hash or \
+                    self.app.tree.sum() != restore.app_hash:
+                return await self._reject()
+            self.app.state = state
+            self.restore = None
+        return ResponseApplySnapshotChunk(result=ApplyResult.Accept)
+
+    async def _reject(self) -> ResponseApplySnapshotChunk:
+        self.restore = None
+        await self._clear_tables()
+        return ResponseApplySnapshotChunk(result=ApplyResult.RejectSnapshot)
+
+    async def _clear_tables(self):
+        async with self.app.database.begin() as connection:
+            await connection.execute(delete(t.cert_entities))
+            await connection.execute(delete(t.cert_entities_archive))
+            await connection.execute(delete(t.app_state))
+        self.app.reset_state()
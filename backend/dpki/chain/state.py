@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select
+
+import csp.sha256
+from dpki import database as t
+from .index import CertIndex, CertRecord
+from .utils import utc_naive
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection
+    from csp.merkle import SparseMerkleTree
+
+
+def cert_value(der_serialized: bytes) -> bytes:
+    """ Value of certificate in state tree """
+    return csp.sha256.digest(der_serialized)
+
+
+def revoked_value(value: bytes, revocated_at: datetime) -> bytes:
+    """ Value of revocated certificate in state tree, `value` is value of certificate before revocation """
+    return csp.sha256.digest(value + utc_naive(revocated_at).isoformat().encode('utf8'))
+
+
+async def load_state(index: 'CertIndex', tree: 'SparseMerkleTree', connection: 'AsyncConnection'):
+    """ Loads certificate index and state tree from `cert_entities` and its archive in one pass """
+    for table in (t.cert_entities, t.cert_entities_archive):
+        c = table.c
+        select_stmt = select(c.sn, c.name, c.public_key, c.not_valid_before, c.not_valid_after, c.revocated_at,
+                             c.der_serialized)
+        async for row in await connection.stream(select_stmt):
+            index.add(CertRecord(row.sn, row.name, row.public_key, row.not_valid_before, row.not_valid_after,
+                                 row.revocated_at))
+            value = cert_value(row.der_serialized)
+            tree.update(row.sn, revoked_value(value, row.revocated_at) if row.revocated_at else value)
@@ -0,0 +1,173 @@
+import base64
+import json
+import struct
+from dataclasses import dataclass
+from enum import IntEnum
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+import csp.sha256
+from ..models import serial_to_sn
+
+REVOKE_PREFIX = b'dpki/revoke/'
+
+# Binary wire format: version and operation followed by fields prefixed with their length
+VERSION = 1
+HEADER = struct.Struct('>BB')
+LENGTH = struct.Struct('>H')
+
+
+class TxCode(IntEnum):
+    """ Result codes of certificate transactions """
+    OK = 0
+    BadEncoding = 1
+    UnknownOperation = 2
+    BadCertificate = 3
+    UnknownIssuer = 4
+    InvalidIssuer = 5
+    BadSignature = 6
+    AlreadyExists = 7
+    NotFound = 8
+    AlreadyRevoked = 9
+    Expired = 10
+    Duplicate = 11
+
+
+class TxOp(IntEnum):
+    """ Operation codes of binary transactions """
+    Issue = 1
+    Revoke = 2
+
+
+class TxError(ValueError):
+    """ Transaction is not acceptable """
+
+    def __init__(self, code: TxCode, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass(frozen=True, kw_only=True)
+class IssueTx:
+    """ Registers certificate issued by one of registered CA
+
+    Attributes:
+        hash: Transaction hash.
+        certificate: Certificate to register.
+        der_serialized: DER serialized certificate.
+    """
+    hash: bytes
+    certificate: x509.Certificate
+    der_serialized: bytes
+
+    @property
+    def sn(self) -> bytes:
+        return serial_to_sn(self.certificate.serial_number)
+
+
+@dataclass(frozen=True, kw_only=True)
+class RevokeTx:
+    """ Revokes certificate. Signed by key of certificate itself or by key of its issuer.
+
+    Attributes:
+        hash: Transaction hash.
+        sn: Serial number of certificate.
+        signature: Signature of `revoke_message(sn)`.
+    """
+    hash: bytes
+    sn: bytes
+    signature: bytes
+
+
+Tx = IssueTx | RevokeTx
+
+
+def revoke_message(sn: bytes) -> bytes:
+    """ Message is signed to revoke certificate with serial number `sn` """
+    return REVOKE_PREFIX + sn
+
+
+def _pack(op: TxOp, *fields: bytes) -> bytes:
+    parts = [HEADER.pack(VERSION, op)]
+    for value in fields:
+        if len(value) > 0xFFFF:
+            raise ValueError('Field of transaction is too long')
+        parts.append(LENGTH.pack(len(value)))
+        parts.append(value)
+    return b''.join(parts)
+
+
+def encode_issue(cert: x509.Certificate) -> bytes:
+    """ Encodes transaction to register certificate """
+    return _pack(TxOp.Issue, cert.public_bytes(encoding=serialization.Encoding.DER))
+
+
+def encode_revoke(sn: bytes, signature: bytes) -> bytes:
+    """ Encodes transaction to revoke certificate """
+    return _pack(TxOp.Revoke, sn, signature)
+
+
+def decode(data: bytes) -> Tx:
+    """ Decodes transaction, binary and legacy JSON transactions are accepted """
+    if data[:1] == b'{':
+        return decode_json(data)
+    view = memoryview(data)
+    try:
+        version, op = HEADER.unpack_from(view)
+    except struct.error:
+        raise TxError(TxCode.BadEncoding, 'Cannot decode transaction')
+    if version != VERSION:
+        raise TxError(TxCode.BadEncoding, f'Unsupported transaction version {version}')
+    fields, pos = [], HEADER.size
+    while pos < len(view):
+        if pos + LENGTH.size > len(view):
+            raise TxError(TxCode.BadEncoding, 'Transaction is truncated')
+        size, = LENGTH.unpack_from(view, pos)
+        pos += LENGTH.size
+        if pos + size > len(view):
+            raise TxError(TxCode.BadEncoding, 'Transaction is truncated')
+        fields.append(view[pos:pos + size])
+        pos += size
+    tx_hash = csp.sha256.digest(data)
+    if op == TxOp.Issue:
+        if len(fields) != 1:
+            raise TxError(TxCode.BadEncoding, 'Cannot decode issue transaction')
+        der_serialized = fields[0].tobytes()
+        try:
+            cert = x509.load_der_x509_certificate(der_serialized)
+        except ValueError:
+            raise TxError(TxCode.BadCertificate, 'Cannot load certificate')
+        return IssueTx(hash=tx_hash, certificate=cert, der_serialized=der_serialized)
+    elif op == TxOp.Revoke:
+        if len(fields) != 2:
+            raise TxError(TxCode.BadEncoding, 'Cannot decode revoke transaction')
+        return RevokeTx(hash=tx_hash, sn=fields[0].tobytes(), signature=fields[1].tobytes())
+    raise TxError(TxCode.UnknownOperation, f'Unknown operation `{op}`')
+
+
+def decode_json(data: bytes) -> Tx:
+    """ Decodes legacy JSON transaction with PEM serialized certificate """
+    try:
+        obj = json.loads(data)
+        op = obj['op']
+    except (ValueError, TypeError, KeyError):
+        raise TxError(TxCode.BadEncoding, 'Cannot decode transaction')
+    tx_hash = csp.sha256.digest(data)
+    if op == 'issue':
+        try:
+            pem_serialized = obj['certificate']
+            cert = x509.load_pem_x509_certificate(pem_serialized.encode('utf8'), backend=default_backend())
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise TxError(TxCode.BadCertificate, 'Cannot load certificate')
+        return IssueTx(hash=tx_hash, certificate=cert,
+                       der_serialized=cert.public_bytes(encoding=serialization.Encoding.DER))
+    elif op == 'revoke':
+        try:
+            sn = bytes.fromhex(obj['sn'])
+            signature = base64.b64decode(obj['signature'], validate=True)
+        except (ValueError, TypeError, KeyError):
+            raise TxError(TxCode.BadEncoding, 'Cannot decode revoke transaction')
+        return RevokeTx(hash=tx_hash, sn=sn, signature=signature)
+    raise TxError(TxCode.UnknownOperation, f'Unknown operation `{op}`')
@@ -1,4 +1,6 @@
 import json
+import time
+from collections import OrderedDict
 from datetime import date, datetime, timezone
 
 
@@ -9,3 +11,49 @@ class JSONEncoder(json.JSONEncoder):
         elif isinstance(obj, date):
             return obj.isoformat()
         return json.JSONEncoder.default(self, obj)
+
+
+def utc_naive(value: datetime) -> datetime:
+    """ Converts datetime to naive UTC as it stored in database """
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+class LRUCache:
+    """ Dictionary with bounded size, least recently used items are evicted first.
+    If `ttl` is set, items expire in `ttl` seconds after they have been put.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.__items = OrderedDict()
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def get(self, key, default=None):
+        try:
+            self.__items.move_to_end(key)
+        except KeyError:
+            return default
+        value, expires = self.__items[key]
+        if expires is not None and expires < time.monotonic():
+            del self.__items[key]
+            return default
+        return value
+
+    def put(self, key, value):
+        self.__items[key] = (value, time.monotonic() + self.ttl if self.ttl is not None else None)
+        self.__items.move_to_end(key)
+        while len(self.__items) > self.maxsize:
+            self.__items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self.__items.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        self.__items.clear()
@@ -0,0 +1,111 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import csp.sha256
+from csp import ed25519
+from . import tx as txs
+from .tx import IssueTx, RevokeTx, Tx, TxCode, TxError
+from .utils import LRUCache, utc_naive
+
+if TYPE_CHECKING:
+    from . import Application
+
+CACHE_SIZE = 100_000
+
+TX_SIGNER_OPTS = ed25519.SignerOpts(hash_options=csp.sha256.HashOpts())
+
+
+@dataclass(frozen=True)
+class Verified:
+    """ Decoded transaction with results of its signature checks
+
+    Attributes:
+        tx: Decoded transaction.
+        signatures: Results of signature checks by keys of certificates with these serial numbers.
+    """
+    tx: Tx
+    signatures: dict[bytes, bool] = field(default_factory=dict)
+
+
+class TxValidator:
+    """ Validates certificate transactions against current state.
+
+    Certificates are looked up in `Application.index`. Results of signature checks do not depend on state, they
+    are kept in LRU cache keyed by transaction hash, so rechecks and delivery of already checked transactions
+    do not verify signatures again. Certificates themselves are always validated against current state.
+    """
+
+    def __init__(self, app: 'Application', cache_size: int = CACHE_SIZE):
+        self.app = app
+        self.verified = LRUCache(cache_size)
+
+    def decode(self, data: bytes) -> Tx:
+        """ Decodes transaction, already verified transactions are taken from cache """
+        verified = self.verified.get(csp.sha256.digest(data))
+        return verified.tx if verified else txs.decode(data)
+
+    async def validate(self, tx: Tx, now: datetime):
+        """ Validates transaction at moment `now`.
+
+        Raises:
+            TxError: If transaction is not acceptable.
+        """
+        now = utc_naive(now)
+        verified = self.verified.get(tx.hash) or Verified(tx)
+        try:
+            if isinstance(tx, IssueTx):
+                await self._check_issue(tx, now, verified.signatures)
+            else:
+                await self._check_revoke(tx, now, verified.signatures)
+        except TxError:
+            self.verified.pop(tx.hash)
+            raise
+        self.verified.put(tx.hash, verified)
+
+    def forget(self, tx: Tx):
+        """ Drops transaction from cache, e.g. after it has been delivered """
+        self.verified.pop(tx.hash)
+
+    def _verify(self, public_key: bytes, signature: bytes, message: bytes) -> bool:
+        pub = self.app.csp.key_import(public_key, ed25519.KeyOpts(private=False))
+        return self.app.csp.verify(pub, signature, message, TX_SIGNER_OPTS)
+
+    async def _check_issue(self, tx: IssueTx, now: datetime, signatures: dict[bytes, bool]):
+        cert = tx.certificate
+        if cert.issuer == cert.subject:
+            raise TxError(TxCode.InvalidIssuer, 'Self-signed certificate can be registered in genesis only')
+        if self.app.index.get(tx.sn):
+            raise TxError(TxCode.AlreadyExists, f'Certificate `{tx.sn.hex()}` already exists')
+        await self.app.paths.validate(cert, now, signatures)
+
+    async def _check_revoke(self, tx: RevokeTx, now: datetime, signatures: dict[bytes, bool]):
+        """ Revocation is signed by key of certificate itself or by key of CA which has issued it and is valid """
+        index, paths = self.app.index, self.app.paths
+        record = index.get(tx.sn)
+        if record is None:
+            raise TxError(TxCode.NotFound, f'Certificate `{tx.sn.hex()}` not found')
+        if record.revocated_at is not None:
+            raise TxError(TxCode.AlreadyRevoked, f'Certificate `{tx.sn.hex()}` already revoked')
+        message = txs.revoke_message(tx.sn)
+        valid = signatures.get(record.sn)
+        if valid is None:
+            valid = signatures[record.sn] = self._verify(record.public_key, tx.signature, message)
+        if valid:
+            return
+        if record.issuer is None:
+            await paths.resolve(record)
+        cert = None
+        for issuer in index.find_by_name(record.issuer):
+            try:
+                await paths.path(issuer, now)
+            except TxError:
+                continue
+            valid = signatures.get(issuer.sn)
+            if valid is None:
+                cert = cert or await paths.certificate(record)
+                valid = signatures[issuer.sn] = paths.verify(issuer.public_key, cert) and \
+                    self._verify(issuer.public_key, tx.signature, message)
+            if valid:
+                return
+        raise TxError(TxCode.BadSignature, 'Revocation signature is not valid')
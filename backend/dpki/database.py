@@ -1,9 +1,9 @@
 import os
-from sqlalchemy import create_engine, String, Text
+from sqlalchemy import create_engine, event, String, Text
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from sqlalchemy import BigInteger, DateTime, LargeBinary
-from sqlalchemy import Table, Column, func
+from sqlalchemy import Table, Column, Index, func
 from sqlalchemy.orm import registry
 
 mapper_registry = registry()
@@ -20,9 +20,35 @@ app_state = Table(
 cert_entities = Table(
     'cert_entities', metadata,
     Column('sn', LargeBinary, primary_key=True),
-    Column('name', String, nullable=False, index=True),
-    Column('public_key', LargeBinary, nullable=False, index=True),
-    Column('pem_serialized', Text, nullable=False),
+    Column('name', String, nullable=False),
+    Column('public_key', LargeBinary, nullable=False),
+    Column('der_serialized', LargeBinary, nullable=False),
+    Column('pem_serialized', Text, nullable=True),
+    Column('not_valid_after', DateTime, nullable=False, index=True),
+    Column('not_valid_before', DateTime, nullable=False),
+    Column('revocated_at', DateTime, nullable=True),
+)
+
+# Indexes of lookups made by `dpki.chain.query`, they have all columns which lookups read, so lookups are answered
+# from index alone. Certificates which are not revoked and revoked ones are indexed separately by partial indexes,
+# `revocated_at` is in index of not revoked ones too, since SQLite reads only indexed columns from covering index.
+_c = cert_entities.c
+Index('ix_cert_entities_valid_by_name', _c.name, _c.not_valid_after, _c.not_valid_before, _c.sn, _c.revocated_at,
+      sqlite_where=_c.revocated_at.is_(None), postgresql_where=_c.revocated_at.is_(None))
+Index('ix_cert_entities_live_by_public_key', _c.public_key, _c.not_valid_after, _c.not_valid_before, _c.sn,
+      _c.revocated_at, sqlite_where=_c.revocated_at.is_(None), postgresql_where=_c.revocated_at.is_(None))
+Index('ix_cert_entities_revoked', _c.revocated_at, _c.sn,
+      sqlite_where=_c.revocated_at.isnot(None), postgresql_where=_c.revocated_at.isnot(None))
+Index('ix_app_state_latest', app_state.c.block_height, app_state.c.app_hash)
+
+# Certificates expired longer than retention are moved here, they are looked up by serial number only
+cert_entities_archive = Table(
+    'cert_entities_archive', metadata,
+    Column('sn', LargeBinary, primary_key=True),
+    Column('name', String, nullable=False),
+    Column('public_key', LargeBinary, nullable=False),
+    Column('der_serialized', LargeBinary, nullable=False),
+    Column('pem_serialized', Text, nullable=True),
     Column('not_valid_after', DateTime, nullable=False),
     Column('not_valid_before', DateTime, nullable=False),
     Column('revocated_at', DateTime, nullable=True),
@@ -43,8 +69,54 @@ def get_database_url(sync=False):
         return database_url
 
 
-def engine_factory(sync=False):
-    if sync:
-        return create_engine(get_database_url(sync=True))
-    else:
-        return create_async_engine(get_database_url(sync=False))
+# Applied to every SQLite connection
+SQLITE_PRAGMAS = dict(
+    journal_mode='WAL',
+    synchronous='NORMAL',
+    cache_size=-64 * 1024,  # KiB
+    mmap_size=256 << 20,
+    temp_store='MEMORY',
+    busy_timeout=5000,
+)
+
+# Pool settings of asyncpg engines, `read_pool_size` is used for read-only engine
+POSTGRES_POOL = dict(pool_size=2, read_pool_size=int(os.environ.get('DATABASE_READ_POOL_SIZE', 8)),
+                     max_overflow=4, pool_recycle=3600, pool_pre_ping=True, statement_cache_size=1024)
+
+
+def _set_sqlite_pragmas(pragmas: dict):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+
+def _engine_options(database_url: str, readonly: bool) -> dict:
+    if '+asyncpg' in database_url:
+        isolation_level = 'REPEATABLE READ' if readonly else 'READ COMMITTED'
+        return dict(isolation_level=isolation_level,
+                    pool_size=POSTGRES_POOL['read_pool_size' if readonly else 'pool_size'],
+                    max_overflow=POSTGRES_POOL['max_overflow'], pool_recycle=POSTGRES_POOL['pool_recycle'],
+                    pool_pre_ping=POSTGRES_POOL['pool_pre_ping'],
+                    connect_args=dict(statement_cache_size=POSTGRES_POOL['statement_cache_size']))
+    return dict()
+
+
+def engine_factory(sync=False, readonly=False, tuned=True):
+    """ Creates database engine
+
+    Args:
+        sync: Create synchronous engine.
+        readonly: Engine is used for reading only, e.g. by queries. SQLite connections are made `query_only`,
+            Postgres transactions are `REPEATABLE READ`.
+        tuned: Apply performance profile: SQLite pragmas `SQLITE_PRAGMAS` and Postgres pool `POSTGRES_POOL`.
+    """
+    database_url = get_database_url(sync=sync)
+    options = _engine_options(database_url, readonly) if tuned and not sync else dict()
+    engine = create_engine(database_url, **options) if sync else create_async_engine(database_url, **options)
+    if tuned and database_url.startswith('sqlite'):
+        pragmas = dict(SQLITE_PRAGMAS, query_only='ON') if readonly else SQLITE_PRAGMAS
+        event.listen(engine if sync else engine.sync_engine, 'connect', _set_sqlite_pragmas(pragmas))
+    return engine
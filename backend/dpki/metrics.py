@@ -0,0 +1,263 @@
+import asyncio
+import functools
+import os
+from bisect import bisect_left
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Upper bounds of latency buckets in seconds
+BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000)
+DUMP_INTERVAL = 15.0
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    items = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        items.append(extra)
+    return '{' + ','.join(items) + '}' if items else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children = dict()
+
+    def _make_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """ Returns series for label values, keep it to update series without lookup """
+        try:
+            return self._children[values]
+        except KeyError:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'Metric {self.name} has labels {self.labelnames}')
+            return self._children.setdefault(values, self._make_child())
+
+    def _samples(self, values, child) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for values, child in list(self._children.items()):
+            yield from self._samples(values, child)
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """ Monotonic counter """
+    kind = 'counter'
+
+    def _make_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _samples(self, values, child) -> Iterator[str]:
+        yield f'{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value)}'
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """ Histogram with fixed buckets, counts are kept per bucket and made cumulative on render """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _make_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self, values, child) -> Iterator[str]:
+        total = 0
+        for bound, count in zip((*map(_format_value, self.buckets), '+Inf'), child.counts):
+            total += count
+            le = f'le="{bound}"'
+            yield f'{self.name}_bucket{_format_labels(self.labelnames, values, le)} {total}'
+        yield f'{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(child.sum)}'
+        yield f'{self.name}_count{_format_labels(self.labelnames, values)} {total}'
+
+
+class Registry:
+    """ Collection of metrics rendered in Prometheus text format """
+
+    def __init__(self):
+        self.__metrics = dict()
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self.__metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return ''.join(line + '\n' for metric in self.__metrics.values() for line in metric.render())
+
+    def dump(self, path: str):
+        """ Writes metrics to file `path`, file is replaced atomically """
+        temp = path + '.tmp'
+        with open(temp, 'w') as file:
+            file.write(self.render())
+        os.replace(temp, path)
+
+
+REGISTRY = Registry()
+
+HANDLER_SECONDS = REGISTRY.histogram('dpki_handler_seconds', 'Latency of ABCI handlers', ('handler',))
+TXS = REGISTRY.counter('dpki_txs', 'Transactions by handler and result', ('handler', 'result'))
+BLOCK_TXS = REGISTRY.histogram('dpki_block_txs', 'Delivered transactions per block', buckets=SIZE_BUCKETS)
+DB_SECONDS = REGISTRY.histogram('dpki_db_statement_seconds', 'Latency of database statements',
+                                ('engine', 'statement'))
+CRYPTO_SECONDS = REGISTRY.histogram('dpki_crypto_seconds', 'Latency of crypto service provider operations',
+                                    ('op',))
+
+
+def timed(series) -> Callable:
+    """ Decorator of coroutine function which observes its latency by histogram `series` """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                series.observe(perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def instrument_engine(engine: 'AsyncEngine', name: str):
+    """ Observes latency of statements executed by `engine`, statements are labeled by their first keyword """
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('dpki_started', []).append(perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info['dpki_started'].pop()
+        DB_SECONDS.labels(name, statement.split(None, 1)[0].lower()).observe(elapsed)
+
+    def handle_error(context):
+        started = context.connection.info.get('dpki_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(sync_engine, 'handle_error', handle_error)
+
+
+class InstrumentedProvider:
+    """ Crypto service provider which observes count and latency of its operations `OPS` """
+    OPS = ('key_import', 'hash', 'sign', 'verify', 'verify_batch')
+
+    def __init__(self, provider):
+        self.provider = provider
+        for op in self.OPS:
+            setattr(self, op, self.__timed(getattr(provider, op), CRYPTO_SECONDS.labels(op)))
+
+    @staticmethod
+    def __timed(func, series):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                series.observe(perf_counter() - started)
+        return wrapper
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, registry: Registry):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[0] == b'GET' and parts[1].split(b'?')[0] == b'/metrics':
+            status, body = b'200 OK', registry.render().encode('utf8')
+        else:
+            status, body = b'404 Not Found', b''
+        writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                     b'Content-Length: ' + str(len(body)).encode('ascii') + b'\r\nConnection: close\r\n\r\n' + body)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 9464, registry: Registry = REGISTRY) -> asyncio.AbstractServer:
+    """ Starts HTTP server which responds with metrics on `GET /metrics` """
+    return await asyncio.start_server(lambda reader, writer: _handle_http(reader, writer, registry), host, port)
+
+
+async def dump_periodically(path: str, interval: float = DUMP_INTERVAL, registry: Registry = REGISTRY):
+    """ Dumps metrics to file `path` every `interval` seconds """
+    while True:
+        registry.dump(path)
+        await asyncio.sleep(interval)
+
+
+async def start(port: int = None, path: str = None) -> list:
+    """ Starts export of metrics configured by arguments or environment variables `METRICS_PORT`, `METRICS_HOST`,
+    `METRICS_FILE` and `METRICS_INTERVAL`. Returns started servers and tasks.
+    """
+    port = port or int(os.environ.get('METRICS_PORT', 0))
+    path = path or os.environ.get('METRICS_FILE')
+    result = []
+    if port:
+        result.append(await serve(os.environ.get('METRICS_HOST', '127.0.0.1'), port))
+    if path:
+        interval = float(os.environ.get('METRICS_INTERVAL', DUMP_INTERVAL))
+        result.append(asyncio.create_task(dump_periodically(path, interval)))
+    return result
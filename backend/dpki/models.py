@@ -1,16 +1,31 @@
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
 
-@dataclass(kw_only=True)
+
+def serial_to_sn(serial_number: int) -> bytes:
+    """ Converts certificate serial number to `sn` representation """
+    return bytes.fromhex('{0:040X}'.format(serial_number))
+
+
+COLUMNS = ('sn', 'name', 'public_key', 'der_serialized', 'pem_serialized', 'not_valid_after', 'not_valid_before',
+           'revocated_at')
+
+
+@dataclass(kw_only=True, slots=True)
 class CertEntity:
     """ Records for certificates and their status
 
+    Records are slotted and keep only stored columns, X.509 certificate is parsed on first access to `certificate`.
+
     Attributes:
         sn: Serial number.
         name: Distinguished name.
         public_key: Bytes representation of public key.
-        pem_serialized: PEM serialized certificate.
+        der_serialized: DER serialized certificate.
+        pem_serialized: PEM serialized certificate, is not stored for new records, see `to_pem`.
         not_valid_before: Certificate valid from this date.
         not_valid_after: Certificate valid till this date.
         revocated_at: Certificate has revocated from this date.
@@ -19,8 +34,41 @@ class CertEntity:
     sn: bytes
     name: str
     public_key: bytes
-    pem_serialized: str
+    der_serialized: bytes
     not_valid_after: datetime
     not_valid_before: datetime
+    pem_serialized: str = None
     revocated_at: datetime = None
     function: str = None
+    _certificate: 'x509.Certificate' = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_certificate(cls, cert: 'x509.Certificate', public_key: bytes,
+                         der_serialized: bytes = None) -> 'CertEntity':
+        """ Makes record for certificate, `der_serialized` is its DER serialization if it is already known """
+        return cls(sn=serial_to_sn(cert.serial_number), name=cert.subject.rfc4514_string(), public_key=public_key,
+                   der_serialized=der_serialized or cert.public_bytes(encoding=serialization.Encoding.DER),
+                   not_valid_before=cert.not_valid_before.replace(tzinfo=timezone.utc),
+                   not_valid_after=cert.not_valid_after.replace(tzinfo=timezone.utc))
+
+    @classmethod
+    def from_row(cls, row) -> 'CertEntity':
+        """ Makes record for row selected from `cert_entities` """
+        return cls(**{column: row._mapping[column] for column in COLUMNS})
+
+    @property
+    def certificate(self) -> 'x509.Certificate':
+        """ Certificate loaded from its DER serialization """
+        if self._certificate is None:
+            self._certificate = x509.load_der_x509_certificate(self.der_serialized)
+        return self._certificate
+
+    def to_row(self) -> dict:
+        """ Returns insert parameters for `cert_entities` """
+        return {column: getattr(self, column) for column in COLUMNS}
+
+    def to_pem(self) -> str:
+        """ Returns PEM serialized certificate, builds it from DER if it is not stored """
+        if self.pem_serialized is None:
+            self.pem_serialized = self.certificate.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+        return self.pem_serialized
@@ -0,0 +1,54 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """ Splits iterable to lists with `size` items at most """
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def map_chunks(fn: Callable[[list], object], chunks: Iterable[list], workers: int = None,
+               executor: Executor = None) -> Iterator[Future]:
+    """ Calls `fn` for every chunk in worker processes, yields futures of results in the order of chunks.
+
+    At most 2 * `workers` chunks are pending, the next chunks are submitted as results are taken. Process pool
+    with `workers` processes (count of CPUs by default) is created if `executor` is not given. If there is one
+    chunk only, or one worker and no `executor`, `fn` is called in this process and yielded futures are done.
+
+    Args:
+        fn: Function of chunk, it must be picklable as well as chunks and results.
+        chunks: Chunks of work.
+        workers: Count of processes of `executor`.
+        executor: Process pool to use.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = iter(chunks)
+    head = list(itertools.islice(chunks, 2))
+    if len(head) < 2 or executor is None and workers < 2:
+        for chunk in itertools.chain(head, chunks):
+            future = Future()
+            future.set_result(fn(chunk))
+            yield future
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    pending = deque()
+    try:
+        for chunk in itertools.chain(head, chunks):
+            pending.append(executor.submit(fn, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
@@ -1 +1 @@
-from .utils import create_csr, apply_csr
\ No newline at end of file
+from .utils import create_csr, apply_csr, apply_csrs
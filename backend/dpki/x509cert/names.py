@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from enum import Enum
 from typing import Optional
 from cryptography import x509
@@ -15,11 +16,14 @@ class Hierarchy(Enum):
 class DistinguishedName(x509.Name):
     """ Distinguished name
     """
-    _raw: tuple[tuple[tuple[str, str], ...], ...]
+    _raw: tuple[tuple[tuple[str, str], ...], ...] = None
+    _selected: dict[Hierarchy, Optional['DistinguishedName']] = None
 
     def __init__(self, *args, **kwargs):
         if len(args) == 1 and isinstance(args[0], str):
-            super().__init__(DistinguishedName.deserialize(args[0]).rdns)
+            parsed = DistinguishedName.deserialize(args[0])
+            super().__init__(parsed.rdns)
+            self._raw = parsed.raw
         else:
             super().__init__(*args, **kwargs)
 
@@ -31,20 +35,36 @@ class DistinguishedName(x509.Name):
         return self._raw
 
     def select(self, hierarchy: Hierarchy) -> Optional['DistinguishedName']:
-        parts = self._extract_hierarchy(hierarchy, self.raw)
-        if parts:
-            normalized = ','.join('='.join(b for b in a) for a in parts)
-            return DistinguishedName.deserialize(normalized)
+        if self._selected is None:
+            self._selected = dict()
+        try:
+            return self._selected[hierarchy]
+        except KeyError:
+            pass
+        selected = None
+        if parts := self._extract_hierarchy(hierarchy, self.raw):
+            selected = DistinguishedName.deserialize(','.join('='.join(b for b in a) for a in parts))
+        self._selected[hierarchy] = selected
+        return selected
 
     @classmethod
     def deserialize(cls, value: str) -> 'DistinguishedName':
-        """ Deserialized object from string """
+        """ Deserialized object from string. Parsed names are cached, instances are shared. """
+        key = (cls, value)
+        if (inst := _cache.get(key)) is not None:
+            _cache.move_to_end(key)
+            return inst
         parts = cls._split(value)
         if not cls._check(parts):
             raise ValueError(f"`{value}` isn't correct distinguished name")
         normalized = ','.join('+'.join('='.join(c for c in b) for b in a) for a in parts)
-        inst = cls(x509.Name.from_rfc4514_string(normalized).rdns)
-        inst._raw = parts
+        if (inst := _cache.get((cls, normalized))) is None:
+            inst = cls(x509.Name.from_rfc4514_string(normalized).rdns)
+            inst._raw = parts
+            _cache[(cls, normalized)] = inst
+        _cache[key] = inst
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
         return inst
 
     def serialize(self) -> str:
@@ -53,41 +73,38 @@ class DistinguishedName(x509.Name):
 
     @staticmethod
     def _extract_hierarchy(hierarchy: Hierarchy, parts: tuple[tuple[tuple[str, str]], ...]) -> tuple[tuple[str, str]]:
-        result = list()
-        for rdns in parts:
-            for key, value in rdns:
-                if key in hierarchy.value:
-                    result.append((key, value))
+        keys = hierarchy.value
+        result = [(key, value) for rdns in parts for key, value in rdns if key in keys]
         if len(result):
             if len(result) == 1:
-                if hierarchy.value[0] in ('C', 'O') and result[0][0] == 'CN':
+                if keys[0] in ('C', 'O') and result[0][0] == 'CN':
                     return tuple()
-                elif hierarchy.value[0] == 'DC' and result[0][0] == 'UID':
+                elif keys[0] == 'DC' and result[0][0] == 'UID':
                     return tuple()
             else:
-                if result[-1][0] == hierarchy.value[0]:
-                    if hierarchy.value[0] == 'DC' or result[0][0] == hierarchy.value[-1]:
+                if result[-1][0] == keys[0]:
+                    if keys[0] == 'DC' or result[0][0] == keys[-1]:
                         return tuple(result)
                 return tuple()
         return tuple(result)
 
     @staticmethod
     def _check(parts: tuple[tuple[tuple[str, str]], ...]) -> bool:
-        if len(parts) > 1:
-            c = DistinguishedName._extract_hierarchy(Hierarchy.Country, parts)
-            o = DistinguishedName._extract_hierarchy(Hierarchy.Organization, parts)
-            dc = DistinguishedName._extract_hierarchy(Hierarchy.Domain, parts)
-            if len(c) or len(o) or len(dc):
-                return True
-        return False
+        return len(parts) > 1 and any(DistinguishedName._extract_hierarchy(hierarchy, parts)
+                                      for hierarchy in (Hierarchy.Country, Hierarchy.Organization, Hierarchy.Domain))
 
     @staticmethod
     def _split(value: str) -> tuple[tuple[tuple[str, str], ...], ...]:
         items = list()
-        for s in value.split(','):
+        for rdn in value.split(','):
             parts = list()
-            for s in s.strip().split('+'):
-                key, value = tuple(map(lambda s: s.strip(), s.strip().split('=')))
-                parts.append((key.upper(), value))
+            for attribute in rdn.split('+'):
+                key, text = attribute.split('=')
+                parts.append((key.strip().upper(), text.strip()))
             items.append(tuple(parts))
         return tuple(items)
+
+
+CACHE_SIZE = 4096
+
+_cache = OrderedDict()  # type: OrderedDict[tuple[type, str], DistinguishedName]
@@ -25,7 +25,7 @@ class Template(ABC):
         self = (tmpl() if issubclass(tmpl, Template) else tmpl)
         if isinstance(distinguished_name, str):
             distinguished_name = DistinguishedName.deserialize(distinguished_name)
-        elif isinstance(distinguished_name, x509.Name):
+        elif not isinstance(distinguished_name, DistinguishedName):
             distinguished_name = DistinguishedName.deserialize(distinguished_name.rfc4514_string())
         for extval, critical in self._make_extensions(distinguished_name, **kw):
             builder = builder.add_extension(extval, critical)
@@ -1,10 +1,15 @@
+import functools
+from concurrent.futures import Executor
 from datetime import date, datetime, time
-from typing import TYPE_CHECKING, Type
+from typing import TYPE_CHECKING, Iterable, Iterator, Type
 
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
 
+from csp import ed25519
 from .names import DistinguishedName
+from ..workers import chunked, map_chunks
 from .template import Template
 
 
@@ -13,6 +18,10 @@ if TYPE_CHECKING:
     CommonBuilder = x509.CertificateSigningRequestBuilder | x509.CertificateBuilder
     IssuerPair = tuple[x509.Certificate | x509.CertificateSigningRequest, Key]
 
+CHUNK_SIZE = 64
+
+_issuers = dict()  # type: dict[tuple[bytes, bytes], tuple[x509.Name, Key]]
+
 
 def create_csr(distinguished_name: str, key: 'Key',
                template: Template | Type[Template], **kwargs) -> x509.CertificateSigningRequest:
@@ -23,20 +32,64 @@ def create_csr(distinguished_name: str, key: 'Key',
     return builder.sign(private_key=key.raw, algorithm=None, backend=default_backend())
 
 
-def apply_csr(csr: x509.CertificateSigningRequest, issuer_pair: 'IssuerPair',
-              not_valid_after: date | str, not_valid_before: date | str = None) -> x509.Certificate:
-    """ Create and sings certificate based on CSR """
+def validity_window(not_valid_after: date | str, not_valid_before: date | str = None) -> tuple[datetime, datetime]:
+    """ Normalizes validity window of certificate, returns `not_valid_before` and `not_valid_after` """
 
     def normalize_if_str(value):
         return date.fromisoformat(value) if isinstance(value, str) else value
 
-    issuer, key = issuer_pair
-    not_valid_after = datetime.combine(normalize_if_str(not_valid_after), time(23, 59, 59))
-    not_valid_before = datetime.combine(normalize_if_str(not_valid_before) or date.today(), time(0, 0, 0))
+    return (datetime.combine(normalize_if_str(not_valid_before) or date.today(), time(0, 0, 0)),
+            datetime.combine(normalize_if_str(not_valid_after), time(23, 59, 59)))
+
+
+def _sign(csr: x509.CertificateSigningRequest, issuer_name: x509.Name, key: 'Key',
+          not_valid_before: datetime, not_valid_after: datetime) -> x509.Certificate:
     builder = x509.CertificateBuilder(subject_name=csr.subject,
                                       extensions=list(csr.extensions),
                                       public_key=csr.public_key()) \
-        .issuer_name(issuer.subject) \
+        .issuer_name(issuer_name) \
         .not_valid_before(not_valid_before).not_valid_after(not_valid_after) \
         .serial_number(x509.random_serial_number())
-    return builder.sign(private_key=key.raw, algorithm=None, backend=default_backend())
+    return builder.sign(private_key=key.raw, algorithm=None)
+
+
+def apply_csr(csr: x509.CertificateSigningRequest, issuer_pair: 'IssuerPair',
+              not_valid_after: date | str, not_valid_before: date | str = None) -> x509.Certificate:
+    """ Create and sings certificate based on CSR """
+    issuer, key = issuer_pair
+    return _sign(csr, issuer.subject, key, *validity_window(not_valid_after, not_valid_before))
+
+
+def _sign_chunk(issuer_der: bytes, key_bytes: bytes, not_valid_before: datetime, not_valid_after: datetime,
+                chunk: list[bytes]) -> list[bytes]:
+    """ Signs chunk of DER serialized CSRs """
+    if (issuer := _issuers.get((issuer_der, key_bytes))) is None:
+        try:
+            name = x509.load_der_x509_certificate(issuer_der).subject
+        except ValueError:
+            name = x509.load_der_x509_csr(issuer_der).subject
+        _issuers.clear()
+        issuer = _issuers[(issuer_der, key_bytes)] = (name, ed25519.Key(key_bytes, ed25519.KeyOpts()))
+    name, key = issuer
+    return [_sign(x509.load_der_x509_csr(csr_der), name, key, not_valid_before, not_valid_after)
+            .public_bytes(serialization.Encoding.DER) for csr_der in chunk]
+
+
+def apply_csrs(csrs: Iterable[x509.CertificateSigningRequest], issuer_pair: 'IssuerPair',
+               not_valid_after: date | str, not_valid_before: date | str = None, workers: int = None,
+               executor: Executor = None, chunk_size: int = CHUNK_SIZE) -> Iterator[x509.Certificate]:
+    """ Creates and signs certificates based on CSRs in bulk.
+
+    CSRs are signed by chunks in worker processes, see `map_chunks` for `workers` and `executor`.
+    Certificates are yielded in the order of `csrs`.
+    """
+    issuer, key = issuer_pair
+    sign_chunk = functools.partial(_sign_chunk, issuer.public_bytes(serialization.Encoding.DER), bytes(key),
+                                   *validity_window(not_valid_after, not_valid_before))
+    chunks = ([csr.public_bytes(serialization.Encoding.DER) for csr in chunk] for chunk in chunked(csrs, chunk_size))
+    results = map_chunks(sign_chunk, chunks, workers, executor)
+    try:
+        for future in results:
+            yield from map(x509.load_der_x509_certificate, future.result())
+    finally:
+        results.close()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def fill(count, expired):
+    """ Fills database with `count` certificates, share `expired` of them expired a year ago """
+    from dpki import database
+    engine = database.engine_factory(sync=True)
+    database.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as connection:
+        for pos in range(0, count, 10_000):
+            connection.execute(database.cert_entities.insert(), [
+                dict(sn=index.to_bytes(20, 'big'), name=f'CN=node{index:07d},O=Benchmark,C=WN',
+                     public_key=os.urandom(32), der_serialized=os.urandom(400),
+                     not_valid_before=now - timedelta(days=730),
+                     not_valid_after=now + timedelta(days=-365 if index < count * expired else 365))
+                for index in range(pos, min(pos + 10_000, count))])
+        connection.execute(database.app_state.insert(), [dict(created_at=now, block_height=1, app_hash=b'')])
+
+
+def sizes():
+    """ Size of tables and indexes of `cert_entities` in pages of SQLite database """
+    from sqlalchemy import text
+    from dpki import database
+    engine = database.engine_factory(sync=True)
+    with engine.connect() as connection:
+        connection.execute(text('VACUUM'))
+        return dict(connection.execute(text("SELECT name, SUM(pgsize) FROM dbstat WHERE name LIKE '%cert_entities%' "
+                                            "GROUP BY name")).all())
+
+
+async def lookups(count, expired, runs):
+    """ Returns median latency of lookups by name, by live serial and by archived serial """
+    from dpki.chain import Application
+    app = Application()
+    now = datetime.now(timezone.utc)
+    live = [index for index in range(int(count * expired), count)]
+    archived = [index for index in range(int(count * expired))] or live
+
+    async def measure(func, indexes):
+        result = []
+        for index in random.sample(indexes, runs):
+            started = time.perf_counter()
+            await func(index)
+            result.append(time.perf_counter() - started)
+        return statistics.median(result)
+
+    async def name(index):
+        _, serials = await app.queries.find_valid(f'CN=node{index:07d},O=Benchmark,C=WN', now)
+        assert serials
+
+    async def serial(index):
+        app.queries.cache.clear()
+        _, (entity,) = await app.queries.get([index.to_bytes(20, 'big')])
+        assert entity is not None
+
+    result = (await measure(name, live), await measure(serial, live), await measure(serial, archived))
+    await app.close()
+    return result
+
+
+async def archive():
+    from dpki.chain import Application
+    app = Application()
+    app.archive.retention = timedelta(days=30)
+    started, total = time.perf_counter(), 0
+    while count := await app.archive.archive(datetime.now(timezone.utc)):
+        total += count
+    elapsed = time.perf_counter() - started
+    await app.close()
+    return total, elapsed
+
+
+def main():
+    logging.disable(logging.ERROR)
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of archival of expired certificates')
+    parser.add_argument('-n', '--count', type=int, default=200_000)
+    parser.add_argument('-e', '--expired', type=float, default=.9, help='Share of expired certificates')
+    parser.add_argument('-r', '--runs', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{os.path.join(path, "database.db")}'
+        fill(args.count, args.expired)
+        before = sizes()
+        name, live, _ = asyncio.run(lookups(args.count, args.expired, args.runs))
+        print(f'before: name {name * 1e6:>7.1f} us, serial {live * 1e6:>7.1f} us')
+        total, elapsed = asyncio.run(archive())
+        print(f'archived {total} certs in {elapsed:.2f} s')
+        after = sizes()
+        name, live, archived = asyncio.run(lookups(args.count, args.expired, args.runs))
+        print(f'after:  name {name * 1e6:>7.1f} us, serial {live * 1e6:>7.1f} us, archived serial '
+              f'{archived * 1e6:>7.1f} us')
+        for key in sorted(set(before) | set(after)):
+            print(f'{key:<40} {before.get(key, 0) / 1024:>10.0f} KiB -> {after.get(key, 0) / 1024:>10.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def make_chain(count):
+    """ Makes root CA and `count` certificates issued by it """
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Benchmark CA, C=WN', key, x509cert.template.CA)
+    issuer_pair = (x509cert.apply_csr(csr, (csr, key), '2070-01-01', '2020-01-01'), key)
+    csrs = [x509cert.create_csr(f'CN=node{index:07d}, O=Benchmark, C=WN', provider.key_gen(ed25519.KeyOpts()),
+                                x509cert.template.User) for index in range(count)]
+    return issuer_pair[0], list(x509cert.apply_csrs(csrs, issuer_pair, '2050-01-01', '2020-01-01'))
+
+
+async def run(root, certs, block_size, tuned):
+    from dpki import database
+    from dpki.chain import Application, tx as txs
+
+    database.metadata.create_all(database.engine_factory(sync=True))
+    app = Application()
+    app.database = database.engine_factory(tuned=tuned)
+    app.reader = database.engine_factory(readonly=True, tuned=tuned)
+    keeper = app.keeper
+    pem = root.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+    await keeper.load_genesis(json.dumps(dict(certificates=[pem])).encode('utf8'))
+
+    txs_data = [txs.encode_issue(cert) for cert in certs]
+    blocks = [txs_data[pos:pos + block_size] for pos in range(0, len(txs_data), block_size)]
+    started = time.perf_counter()
+    for height, block in enumerate(blocks, 1):
+        header = SimpleNamespace(height=height, time=datetime.now(timezone.utc))
+        await keeper.begin_block(SimpleNamespace(header=header))
+        for data in block:
+            resp = await keeper.deliver_tx(SimpleNamespace(tx=data))
+            assert resp.code == 0, resp.log
+        await keeper.end_block(SimpleNamespace(height=height))
+        await keeper.commit(SimpleNamespace())
+    elapsed = time.perf_counter() - started
+    await app.close()
+    return len(blocks) / elapsed, len(txs_data) / elapsed
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of block delivery and commit')
+    parser.add_argument('-b', '--block-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('-n', '--txs', type=int, default=2000, help='Count of transactions for each block size')
+    args = parser.parse_args()
+
+    root, certs = make_chain(args.txs)
+    for block_size in args.block_sizes:
+        line = f'{block_size:>5} txs/block:'
+        for title, tuned in (('default', False), ('tuned', True)):
+            with tempfile.TemporaryDirectory() as path:
+                os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{os.path.join(path, "database.db")}'
+                blocks_rate, txs_rate = asyncio.run(run(root, certs, block_size, tuned))
+            line += f' {title} {blocks_rate:>8.1f} blocks/sec ({txs_rate:>6.0f} txs/sec)'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
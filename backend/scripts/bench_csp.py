@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+import csp.sha256
+from csp import ed25519
+from csp.provider import CSProvider
+
+
+def make_items(provider, count, opts):
+    keys = [provider.key_gen(ed25519.KeyOpts()) for _ in range(min(count, 1000))]
+    items = []
+    for index in range(count):
+        key = keys[index % len(keys)]
+        digest = index.to_bytes(8, 'big') * 32
+        items.append((key.public_key, provider.sign(key, digest, opts), digest))
+    return items
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of batch signature verification')
+    parser.add_argument('-n', '--sizes', type=int, nargs='+', default=[100, 1000, 10_000])
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    opts = ed25519.SignerOpts(hash_options=csp.sha256.HashOpts())
+    provider = CSProvider(max_workers=args.workers)
+    for count in args.sizes:
+        items = make_items(provider, count, opts)
+        loop = measure(lambda: [provider.verify(*item, opts) for item in items], args.repeat)
+        batch = measure(lambda: provider.verify_batch(items, opts), args.repeat)
+        print(f'{count:>7} signatures: verify loop {count / loop:>9.0f}/sec, '
+              f'verify_batch {count / batch:>9.0f}/sec, speedup x{loop / batch:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of bulk certificate issuance')
+    parser.add_argument('-n', '--count', type=int, default=10_000)
+    parser.add_argument('-c', '--chunk-size', type=int, default=x509cert.utils.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Benchmark CA, C=WN', key, x509cert.template.CA)
+    issuer_pair = (x509cert.apply_csr(csr, (csr, key), '2070-01-01'), key)
+    csrs = [x509cert.create_csr(f'CN=user{index:07d}, O=Benchmark, C=WN', provider.key_gen(ed25519.KeyOpts()),
+                                x509cert.template.User) for index in range(args.count)]
+
+    started = time.perf_counter()
+    for csr in csrs:
+        x509cert.apply_csr(csr, issuer_pair, '2050-01-01')
+    single = args.count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    count = sum(1 for _ in x509cert.apply_csrs(csrs, issuer_pair, '2050-01-01', chunk_size=args.chunk_size))
+    bulk = count / (time.perf_counter() - started)
+    print(f'{args.count} CSRs: apply_csr {single:>8.0f} certs/sec, apply_csrs {bulk:>8.0f} certs/sec '
+          f'({os.cpu_count()} CPUs)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import dataclasses
+import gc
+import itertools
+import os
+import sys
+import tracemalloc
+
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+
+from dpki.models import CertEntity
+from scripts.bench_genesis import make_certificates
+
+# Certificate entity as it was before: plain dataclass storing PEM
+LegacyCertEntity = dataclasses.make_dataclass('LegacyCertEntity', [
+    ('sn', bytes), ('name', str), ('public_key', bytes), ('pem_serialized', str), ('not_valid_after', object),
+    ('not_valid_before', object), ('revocated_at', object, None), ('function', str, None)], kw_only=True)
+# Plain dataclass storing DER, it differs from `CertEntity` by slots only
+DerCertEntity = dataclasses.make_dataclass('DerCertEntity', [
+    ('sn', bytes), ('name', str), ('public_key', bytes), ('der_serialized', bytes), ('not_valid_after', object),
+    ('not_valid_before', object), ('pem_serialized', str, None), ('revocated_at', object, None),
+    ('function', str, None)], kw_only=True)
+
+
+def measure(make, certs, count):
+    """ Returns memory in bytes allocated by `count` results of `make` """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [make(index, cert) for index, cert in zip(range(count), itertools.cycle(certs))]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del items
+    return size
+
+
+def legacy_read(index, cert):
+    entity = cert['entity']
+    return LegacyCertEntity(sn=index.to_bytes(20, 'big'), name=entity.name[:],
+                            public_key=bytes(bytearray(cert['key'])),
+                            pem_serialized=cert['pem'].encode('utf8').decode('utf8'),
+                            not_valid_after=entity.not_valid_after.replace(),
+                            not_valid_before=entity.not_valid_before.replace())
+
+
+def legacy_buffer(index, cert):
+    entity = legacy_read(index, cert)
+    return dataclasses.asdict(entity)
+
+
+def der_read(index, cert, cls=DerCertEntity):
+    entity = cert['entity']
+    return cls(sn=index.to_bytes(20, 'big'), name=entity.name[:], public_key=bytes(bytearray(cert['key'])),
+               der_serialized=bytes(bytearray(entity.der_serialized)),
+               not_valid_after=entity.not_valid_after.replace(), not_valid_before=entity.not_valid_before.replace())
+
+
+def der_buffer(index, cert):
+    return dataclasses.asdict(der_read(index, cert))
+
+
+def slotted_read(index, cert):
+    return der_read(index, cert, CertEntity)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Memory of certificate entities working set')
+    parser.add_argument('-n', '--count', type=int, default=1_000_000)
+    parser.add_argument('-u', '--unique', type=int, default=500, help='Count of unique certificates to cycle')
+    args = parser.parse_args()
+
+    certs = []
+    for pem in make_certificates(args.unique):
+        cert = x509.load_pem_x509_certificate(pem.encode('utf8'))
+        key = cert.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        certs.append(dict(pem=pem, key=key, entity=CertEntity.from_certificate(cert, key)))
+
+    # Rows with DER differ from rows with PEM by storage format, slotted rows differ from dataclass
+    # rows with DER by slots and lazy certificate only
+    results = [
+        ('read, dataclass with PEM', measure(legacy_read, certs, args.count)),
+        ('read, dataclass with DER', measure(der_read, certs, args.count)),
+        ('read, slotted with DER', measure(slotted_read, certs, args.count)),
+        ('insert, dataclass with PEM + asdict', measure(legacy_buffer, certs, args.count)),
+        ('insert, dataclass with DER + asdict', measure(der_buffer, certs, args.count)),
+        ('insert, slotted with DER', measure(slotted_read, certs, args.count)),
+    ]
+    for title, size in results:
+        print(f'{title:>35}: {size / 2 ** 20:>8.1f} MiB, {size / args.count:>5.0f} bytes/cert')
+
+
+if __name__ == '__main__':
+    main()
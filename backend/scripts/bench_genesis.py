@@ -0,0 +1,68 @@
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.merkle import SparseMerkleTree
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+from dpki.chain import genesis
+from dpki.chain.state import cert_value
+
+
+def make_certificates(count):
+    """ Makes `count` PEM serialized certificates issued by one CA """
+    provider = CSProvider()
+    ca_key = provider.key_gen(ed25519.KeyOpts())
+    ca_csr = x509cert.create_csr('CN=Benchmark CA, C=WN', ca_key, x509cert.template.CA)
+    issuer_pair = (x509cert.apply_csr(ca_csr, (ca_csr, ca_key), '2070-01-01'), ca_key)
+    result = []
+    for index in range(count):
+        key = provider.key_gen(ed25519.KeyOpts())
+        csr = x509cert.create_csr(f'CN=node{index:07d}, O=Benchmark, C=WN', key, x509cert.template.User)
+        cert = x509cert.apply_csr(csr, issuer_pair, '2050-01-01')
+        result.append(cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8'))
+    return result
+
+
+async def run(pems, count, workers=None):
+    rows = 0
+    tree = SparseMerkleTree()
+
+    async def insert_rows(batch):
+        nonlocal rows
+        rows += len(batch)
+        for entity, record in batch:
+            tree.update(record.sn, cert_value(entity.der_serialized))
+
+    started = time.perf_counter()
+    await genesis.ingest(itertools.islice(itertools.cycle(pems), count), insert_rows, workers=workers)
+    elapsed = time.perf_counter() - started
+    assert rows == count
+    return count / elapsed
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of genesis certificates ingestion')
+    parser.add_argument('-n', '--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('-u', '--unique', type=int, default=2000, help='Count of unique certificates to cycle')
+    parser.add_argument('--serial', action='store_true', help='Measure also single process ingestion')
+    args = parser.parse_args()
+
+    pems = make_certificates(args.unique)
+    for count in args.sizes:
+        line = f'{count:>9} certs: pool {asyncio.run(run(pems, count)):>10.0f} certs/sec'
+        if args.serial:
+            line += f', serial {asyncio.run(run(pems, count, workers=1)):>10.0f} certs/sec'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
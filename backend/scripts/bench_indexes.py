@@ -0,0 +1,97 @@
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Single column indexes which the covering ones replace
+OLD_INDEXES = ('CREATE INDEX ix_cert_entities_name ON cert_entities (name)',
+               'CREATE INDEX ix_cert_entities_public_key ON cert_entities (public_key)',
+               'CREATE INDEX ix_app_state_block_height ON app_state (block_height)')
+NEW_INDEXES = ('ix_cert_entities_valid_by_name', 'ix_cert_entities_live_by_public_key', 'ix_cert_entities_revoked',
+               'ix_app_state_latest')
+
+
+def fill(engine, count, heights, now):
+    """ Fills database with `count` subjects having valid, expired and revoked certificate each """
+    from dpki import database
+    database.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for pos in range(0, count, 10_000):
+            rows = []
+            for index in range(pos, min(pos + 10_000, count)):
+                for kind in range(3):
+                    rows.append(dict(sn=(index * 3 + kind).to_bytes(20, 'big'), name=f'CN=node{index:07d},C=WN',
+                                     public_key=index.to_bytes(32, 'big'), der_serialized=os.urandom(400),
+                                     not_valid_before=now - timedelta(days=400),
+                                     not_valid_after=now + timedelta(days=-35 if kind == 1 else 365),
+                                     revocated_at=now - timedelta(seconds=index) if kind == 2 else None))
+            connection.execute(database.cert_entities.insert(), rows)
+        connection.execute(database.app_state.insert(), [
+            dict(created_at=now + timedelta(seconds=height), block_height=height, app_hash=os.urandom(32))
+            for height in range(1, heights + 1)])
+
+
+def measure(engine, count, runs, now):
+    """ Median latency of lookups by statements of query handler, the first pass warms up page cache """
+    from dpki.chain import SELECT_LATEST, query
+    since = now - timedelta(seconds=100)
+    lookups = dict(valid_by_name=lambda index: (query._SELECT_VALID_BY_NAME,
+                                                dict(name=f'CN=node{index:07d},C=WN', at=now)),
+                   live_by_public_key=lambda index: (query._SELECT_LIVE_BY_PUBLIC_KEY,
+                                                     dict(public_key=index.to_bytes(32, 'big'), at=now)),
+                   revoked_since=lambda index: (query._SELECT_REVOKED_SINCE, dict(since=since)),
+                   latest_app_state=lambda index: (SELECT_LATEST, dict()))
+    result = dict()
+    with engine.connect() as connection:
+        for name, make in [*lookups.items(), *lookups.items()]:
+            elapsed = []
+            for index in random.sample(range(count), runs):
+                select_stmt, params = make(index)
+                started = time.perf_counter()
+                connection.execute(select_stmt, params).all()
+                elapsed.append(time.perf_counter() - started)
+            result[name] = statistics.median(elapsed)
+    return result
+
+
+def index_size(engine):
+    from sqlalchemy import text
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'ix_%'")).scalar()
+
+
+def main():
+    logging.disable(logging.ERROR)
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of lookups by covering indexes against single column ones')
+    parser.add_argument('-n', '--count', type=int, default=100_000, help='Count of subjects')
+    parser.add_argument('--heights', type=int, default=100_000, help='Count of stored app states')
+    parser.add_argument('-r', '--runs', type=int, default=2000)
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+    from dpki import database
+    now = datetime(2030, 1, 1)
+    with tempfile.TemporaryDirectory() as path:
+        os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{os.path.join(path, "database.db")}'
+        engine = database.engine_factory(sync=True)
+        fill(engine, args.count, args.heights, now)
+        covering, covering_size = measure(engine, args.count, args.runs, now), index_size(engine)
+        with engine.begin() as connection:
+            for name in NEW_INDEXES:
+                connection.execute(text(f'DROP INDEX {name}'))
+            for create in OLD_INDEXES:
+                connection.execute(text(create))
+        single, single_size = measure(engine, args.count, args.runs, now), index_size(engine)
+    for name in covering:
+        print(f'{name:<20} single {single[name] * 1e6:>9.1f} us, covering {covering[name] * 1e6:>9.1f} us')
+    print(f'size of indexes: single {single_size >> 20} MiB, covering {covering_size >> 20} MiB')
+
+
+if __name__ == '__main__':
+    main()
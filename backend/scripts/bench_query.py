@@ -0,0 +1,62 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from scripts.bench_genesis import make_certificates
+
+
+async def run(certs, queries, cache_size):
+    from dpki import database
+    from dpki.chain import Application
+    from dpki.chain.query import QueryHandler
+
+    database.metadata.create_all(database.engine_factory(sync=True))
+    app = Application()
+    app.queries = QueryHandler(app, cache_size=cache_size)
+    await app.keeper.load_genesis(json.dumps(dict(certificates=certs)).encode('utf8'))
+    app.keeper.buffer.set_app_state(1, app.tree.sum(), datetime.now(timezone.utc))
+    await app.keeper.end_transaction()
+    app.reset_committed(1)
+    serials = [record.sn for record in app.index]
+
+    rnd = random.Random(0)
+    # Relying parties ask about a hot subset of certificates much more often
+    hot = serials[:max(1, len(serials) // 10)]
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(queries):
+        sn = rnd.choice(hot) if rnd.random() < 0.9 else rnd.choice(serials)
+        query_started = time.perf_counter()
+        resp = await app.query(SimpleNamespace(path='/cert/sn', data=sn, height=0, prove=False))
+        latencies.append(time.perf_counter() - query_started)
+        assert resp.code == 0
+    elapsed = time.perf_counter() - started
+    await app.close()
+    latencies.sort()
+    return queries / elapsed, latencies[int(len(latencies) * 0.99)] * 1e6
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Load benchmark of certificate status queries')
+    parser.add_argument('-c', '--certs', type=int, default=10_000)
+    parser.add_argument('-q', '--queries', type=int, default=50_000)
+    args = parser.parse_args()
+
+    certs = make_certificates(args.certs)
+    for title, cache_size in (('cache off', 0), ('cache on', args.certs)):
+        with tempfile.TemporaryDirectory() as path:
+            os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{os.path.join(path, "database.db")}'
+            rate, p99 = asyncio.run(run(certs, args.queries, cache_size))
+        print(f'{title:>9}: {rate:>9.0f} queries/sec, p99 {p99:>8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
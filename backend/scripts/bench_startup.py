@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Modules which were imported by `dpki.chain` before they have been made lazy
+EAGER_MODULES = ('csp.provider', 'dpki.chain.path', 'dpki.chain.query', 'dpki.chain.snapshots',
+                 'dpki.chain.validator')
+
+
+def import_time(modules, runs):
+    """ Median time of importing `modules` by fresh interpreter """
+    code = f'import time; started = time.perf_counter()\n' \
+           f'import {", ".join(modules)}\n' \
+           f'print(time.perf_counter() - started)'
+    return statistics.median(float(subprocess.check_output([sys.executable, '-c', code], env=os.environ))
+                             for _ in range(runs))
+
+
+def fill(count, heights):
+    """ Fills database with `count` certificates and `heights` app states """
+    from dpki import database
+    engine = database.engine_factory(sync=True)
+    database.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as connection:
+        for pos in range(0, count, 10_000):
+            connection.execute(database.cert_entities.insert(), [
+                dict(sn=index.to_bytes(20, 'big'), name=f'CN=node{index:07d},O=Benchmark,C=WN',
+                     public_key=os.urandom(32), der_serialized=os.urandom(400),
+                     not_valid_before=now, not_valid_after=now + timedelta(days=365))
+                for index in range(pos, min(pos + 10_000, count))])
+        connection.execute(database.app_state.insert(), [
+            dict(created_at=now + timedelta(seconds=height), block_height=height, app_hash=os.urandom(32))
+            for height in range(1, heights + 1)])
+
+
+async def start():
+    """ Returns time of Info handshake and time till the application is ready """
+    from dpki.chain import Application
+    started = time.perf_counter()
+    app = Application()
+    state = await app.get_initial_app_state()
+    info = time.perf_counter() - started
+    await app.ready()
+    ready = time.perf_counter() - started
+    assert state.block_height
+    await app.close()
+    return info, ready
+
+
+def main():
+    logging.disable(logging.ERROR)
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of restart to ready time')
+    parser.add_argument('-n', '--sizes', type=int, nargs='+', default=[0, 10_000, 100_000])
+    parser.add_argument('--heights', type=int, default=100_000, help='Count of stored app states')
+    parser.add_argument('-r', '--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    lazy = import_time(['dpki.chain'], args.runs)
+    eager = import_time(['dpki.chain', *EAGER_MODULES], args.runs)
+    print(f'import: lazy {lazy * 1000:>7.1f} ms, eager {eager * 1000:>7.1f} ms')
+    for count in args.sizes:
+        with tempfile.TemporaryDirectory() as path:
+            os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{os.path.join(path, "database.db")}'
+            fill(count, args.heights)
+            info, ready = asyncio.run(start())
+        print(f'{count:>9} certs: info {info * 1000:>8.1f} ms, ready {ready * 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
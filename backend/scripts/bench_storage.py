@@ -0,0 +1,65 @@
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from sqlalchemy import Column, LargeBinary, MetaData, Table, Text, create_engine, insert, select
+
+from scripts.bench_genesis import make_certificates
+
+BATCH_SIZE = 5000
+
+
+def run(certs, count, column_type, serialize, load):
+    """ Stores `count` certificates in column of `column_type`, returns size of database and certs/sec of reading """
+    metadata = MetaData()
+    table = Table('certs', metadata, Column('sn', LargeBinary, primary_key=True), Column('cert', column_type))
+    values = [serialize(cert) for cert in certs]
+    with tempfile.TemporaryDirectory() as path:
+        filename = os.path.join(path, 'database.db')
+        engine = create_engine(f'sqlite:///{filename}')
+        metadata.create_all(engine)
+        rows = ((index.to_bytes(20, 'big'), value) for index, value in zip(range(count), itertools.cycle(values)))
+        with engine.begin() as connection:
+            while batch := [dict(sn=sn, cert=value) for sn, value in itertools.islice(rows, BATCH_SIZE)]:
+                connection.execute(insert(table), batch)
+        size = os.path.getsize(filename)
+
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            for row in connection.execution_options(yield_per=BATCH_SIZE).execute(select(table.c.cert)):
+                load(row.cert)
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    return size, count / elapsed
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of PEM and DER certificates storage')
+    parser.add_argument('-n', '--count', type=int, default=1_000_000)
+    parser.add_argument('-u', '--unique', type=int, default=2000, help='Count of unique certificates to cycle')
+    args = parser.parse_args()
+
+    certs = [x509.load_pem_x509_certificate(pem.encode('utf8')) for pem in make_certificates(args.unique)]
+    results = dict(
+        PEM=run(certs, args.count, Text,
+                lambda cert: cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8'),
+                lambda value: x509.load_pem_x509_certificate(value.encode('utf8'))),
+        DER=run(certs, args.count, LargeBinary,
+                lambda cert: cert.public_bytes(encoding=serialization.Encoding.DER),
+                x509.load_der_x509_certificate),
+    )
+    for title, (size, rate) in results.items():
+        print(f'{title}: {size / 2 ** 20:>9.1f} MiB, {size / args.count:>6.0f} bytes/cert, '
+              f'read and parse {rate:>9.0f} certs/sec')
+    print(f'DER saves {1 - results["DER"][0] / results["PEM"][0]:.1%} of space, '
+          f'parses {results["DER"][1] / results["PEM"][1]:.2f}x faster')
+
+
+if __name__ == '__main__':
+    main()
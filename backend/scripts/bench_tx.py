@@ -0,0 +1,54 @@
+import base64
+import json
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+
+from bench_blocks import make_chain
+
+
+def encode_issue_json(cert) -> bytes:
+    """ JSON transaction with PEM serialized certificate """
+    pem_serialized = cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+    return json.dumps(dict(op='issue', certificate=pem_serialized)).encode('utf8')
+
+
+def encode_revoke_json(sn: bytes, signature: bytes) -> bytes:
+    return json.dumps(dict(op='revoke', sn=sn.hex(), signature=base64.b64encode(signature).decode())).encode('utf8')
+
+
+def measure(decode, items, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for data in items:
+            decode(data)
+    return (time.perf_counter() - started) * 1e6 / (rounds * len(items))
+
+
+def main():
+    import argparse
+    from dpki.chain import tx as txs
+    from dpki.models import serial_to_sn
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description='Benchmark of transaction wire formats')
+    parser.add_argument('-n', '--txs', type=int, default=1000)
+    parser.add_argument('-r', '--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    _, certs = make_chain(args.txs)
+    signature = os.urandom(64)
+    formats = (('binary', txs.encode_issue, txs.encode_revoke, txs.decode),
+               ('json+pem', encode_issue_json, encode_revoke_json, txs.decode_json))
+    for title, encode_issue, encode_revoke, decode in formats:
+        issues = [encode_issue(cert) for cert in certs]
+        revokes = [encode_revoke(serial_to_sn(cert.serial_number), signature) for cert in certs]
+        print(f'{title:>8}: issue {sum(map(len, issues)) / len(issues):>6.1f} bytes, '
+              f'{measure(decode, issues, args.rounds):>6.2f} us; '
+              f'revoke {sum(map(len, revokes)) / len(revokes):>6.1f} bytes, '
+              f'{measure(decode, revokes, args.rounds):>6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
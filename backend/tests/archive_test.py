@@ -0,0 +1,50 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def test_archive(genesis_app, root_ca):
+    from dpki import database
+    from dpki.chain import Application
+    provider = CSProvider()
+    certs = [root_ca[0]] + [x509cert.apply_csr(x509cert.create_csr(f'CN=user{index}, C=WN',
+                                                                   provider.key_gen(ed25519.KeyOpts()),
+                                                                   x509cert.template.User),
+                                               root_ca, '2021-01-01' if index % 2 else '2050-01-01', '2020-01-01')
+                            for index in range(6)]
+
+    async def count(app, table):
+        async with app.reader.connect() as connection:
+            return len((await connection.execute(table.select())).all())
+
+    async def run():
+        app = await genesis_app(certs)
+        app.archive.retention = timedelta(days=30)
+        await app.keeper.end_transaction()
+        header = SimpleNamespace(height=1, time=datetime(2030, 1, 1, tzinfo=timezone.utc))
+        await app.keeper.begin_block(SimpleNamespace(header=header))
+        await app.keeper.end_block(SimpleNamespace(height=1))
+        app_hash = (await app.keeper.commit(SimpleNamespace())).data
+        # Archival runs in background after commit has returned
+        assert not app.archive.archiving.done()
+        await app.archive.archiving
+        assert await count(app, database.cert_entities) == 4
+        assert await count(app, database.cert_entities_archive) == 3
+        resp = await app.query(SimpleNamespace(path='/cert/name', data=b'CN=user1,C=WN'))
+        status, = json.loads(resp.value)
+        assert status['name'] == 'CN=user1,C=WN' and not status['valid']
+        await app.close()
+
+        app = Application()
+        state = await app.get_initial_app_state()
+        await app.ready()
+        assert state.app_hash == app_hash == app.tree.sum() and len(app.index) == 7
+        await app.close()
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+@pytest.fixture
+def make_database(monkeypatch, tmp_path):
+    """ Function which creates SQLite database `name` with schema in temporary directory of test, makes it
+    database of application and returns synchronous engine of it
+    """
+
+    def make(name: str = 'database.db'):
+        from dpki import database
+        monkeypatch.setenv('DATABASE_URL', f'sqlite+aiosqlite:///{os.path.join(tmp_path, name)}')
+        engine = database.engine_factory(sync=True)
+        database.metadata.create_all(engine)
+        return engine
+
+    return make
+
+
+@pytest.fixture
+def root_ca():
+    """ Self-signed root CA certificate and its key """
+    key = CSProvider().key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Wonderland root CA, C=WN', key, x509cert.template.CA)
+    return x509cert.apply_csr(csr, (csr, key), '2070-01-01', '2020-01-01'), key
+
+
+@pytest.fixture
+def genesis_app(make_database):
+    """ Coroutine function which creates application over new database `name` and loads certificates as genesis,
+    transaction of genesis is left open as it is till the first commit
+    """
+
+    async def load(certs: list, name: str = 'database.db'):
+        from dpki.chain import Application
+        make_database(name)
+        app = Application()
+        pems = [cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8') for cert in certs]
+        await app.keeper.load_genesis(json.dumps(dict(certificates=pems)).encode('utf8'))
+        return app
+
+    return load
+
+
+@pytest.fixture
+def issue():
+    """ Function which creates certificate `name` signed by `issuer_pair` (self-signed if it is `None`) and
+    returns it with its key
+    """
+    provider = CSProvider()
+
+    def make(name: str, issuer_pair, template=x509cert.template.User, not_valid_after: str = '2050-01-01', **kwargs):
+        key = provider.key_gen(ed25519.KeyOpts())
+        csr = x509cert.create_csr(name, key, template, **kwargs)
+        return x509cert.apply_csr(csr, issuer_pair or (csr, key), not_valid_after, '2023-01-01'), key
+
+    return make
+
+
+@pytest.fixture
+def register():
+    """ Function which applies transaction issuing certificate without validation and returns its index record """
+
+    def apply(app, cert):
+        from dpki.chain import tx as txs
+        tx = txs.decode(txs.encode_issue(cert))
+        app.keeper.apply_tx(tx)
+        return app.index.get(tx.sn)
+
+    return apply
@@ -0,0 +1,45 @@
+import csp.sha256
+from csp import ed25519
+from csp.provider import CSProvider
+
+
+def test_verify_batch():
+    provider = CSProvider(max_workers=3)
+    opts = ed25519.SignerOpts(hash_options=csp.sha256.HashOpts())
+    keys = [provider.key_gen(ed25519.KeyOpts()) for _ in range(5)]
+    items = []
+    for index in range(200):
+        key = keys[index % len(keys)]
+        digest = f'message {index}'.encode()
+        signature = provider.sign(key, digest, opts)
+        if index % 7 == 0:
+            signature = bytes(64)
+        elif index % 11 == 0:
+            digest += b'!'
+        items.append((key.public_key if index % 2 else key, signature, digest))
+    expected = [provider.verify(*item, opts) for item in items]
+    assert expected == [not (index % 7 == 0 or index % 11 == 0) for index in range(200)]
+    assert provider.verify_batch(items, opts) == expected
+    assert provider.verify_batch(items[:3], opts) == expected[:3]
+    assert provider.verify_batch([], opts) == []
+
+
+def test_public_key_interning():
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    assert not hasattr(key, '__dict__')
+    assert key.public_key is key.public_key
+    assert bytes(key) is bytes(key)
+    raw = bytes(key.public_key)
+    imported = provider.key_import(raw, ed25519.KeyOpts(private=False))
+    assert imported is key.public_key
+    assert provider.key_import(key.raw.public_key()) is imported
+    assert imported.public_key is imported and not imported.private
+
+    ed25519_intern_size, ed25519.INTERN_SIZE = ed25519.INTERN_SIZE, 2
+    try:
+        others = [provider.key_gen(ed25519.KeyOpts()).public_key for _ in range(3)]
+        assert provider.key_import(raw, ed25519.KeyOpts(private=False)) is not imported
+        assert provider.key_import(bytes(others[-1]), ed25519.KeyOpts(private=False)) is others[-1]
+    finally:
+        ed25519.INTERN_SIZE = ed25519_intern_size
@@ -0,0 +1,74 @@
+import asyncio
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def test_iter_certificates():
+    from dpki.chain.genesis import iter_certificates
+    app_state = {
+        'version': 12345678901234567890,
+        'params': {'nested': [1, 2.5, None, True, {'certificates': ['not me']}], 'text': 'a\\"b'},
+        'certificates': [f'-----BEGIN CERTIFICATE-----\n{i:0100d}\\u0410"\n-----END CERTIFICATE-----\n'
+                         for i in range(50)],
+        'tail': 'x' * 300,
+    }
+    data = json.dumps(app_state, indent=1).encode('utf8')
+    expected = json.loads(data)['certificates']
+    for read_size in (1, 7, 64, 1 << 16):
+        assert list(iter_certificates(data, read_size=read_size)) == expected
+        assert list(iter_certificates(io.BytesIO(data), read_size=read_size)) == expected
+
+
+def test_iter_certificates_errors():
+    from dpki.chain.genesis import iter_certificates
+    assert list(iter_certificates(b'{"certificates": []}')) == []
+    with pytest.raises(KeyError):
+        list(iter_certificates(b'{"other": []}'))
+    with pytest.raises(ValueError):
+        list(iter_certificates(b'{"certificates": ["a", "b"'))
+
+
+def test_ingest_by_workers():
+    from csp.merkle import SparseMerkleTree
+    from dpki.chain import genesis, state
+    from dpki.chain.index import CertIndex
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Wonderland root CA, C=WN', key, x509cert.template.CA)
+    issuer_pair = (x509cert.apply_csr(csr, (csr, key), '2070-01-01'), key)
+    csrs = [x509cert.create_csr(f'CN=user{index}, C=WN', provider.key_gen(ed25519.KeyOpts()),
+                                x509cert.template.User) for index in range(40)]
+    pems = [cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+            for cert in [issuer_pair[0], *x509cert.apply_csrs(csrs, issuer_pair, '2050-01-01')]]
+    data = json.dumps(dict(certificates=pems)).encode('utf8')
+
+    async def ingest(**kwargs):
+        rows, batches, index, tree = [], [], CertIndex(), SparseMerkleTree()
+
+        async def insert_rows(batch):
+            batches.append(len(batch))
+            for entity, record in batch:
+                rows.append(entity.to_row())
+                index.add(record)
+                tree.update(record.sn, state.cert_value(entity.der_serialized))
+
+        count = await genesis.ingest(genesis.iter_certificates(data), insert_rows, **kwargs)
+        records = [(record.sn, record.name, record.public_key, record.not_valid_before, record.not_valid_after,
+                    record.issuer, record.ca) for record in index]
+        return count, rows, records, tree.sum(), batches
+
+    serial = asyncio.run(ingest(chunk_size=len(pems) + 1))
+    assert serial[0] == len(pems) and serial[4] == [len(pems)]
+    with ProcessPoolExecutor(2) as executor:
+        parallel = asyncio.run(ingest(workers=2, executor=executor, chunk_size=4, batch_size=7))
+    assert parallel[:4] == serial[:4]
+    assert parallel[4] == [7] * 5 + [len(pems) - 35]
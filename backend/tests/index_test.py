@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+
+
+def test_index_rollback():
+    from dpki.chain.index import CertIndex, CertRecord
+    now = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    index = CertIndex()
+    root = CertRecord(b'\x01', 'CN=Root,C=WN', b'k1', now - timedelta(days=1), now + timedelta(days=1))
+    index.add(root)
+    assert index.get(b'\x01').is_valid(now.replace(tzinfo=None))
+
+    index.begin()
+    index.add(CertRecord(b'\x02', 'CN=Root,C=WN', b'k2', now, now + timedelta(days=1)))
+    index.revoke(b'\x01', now)
+    assert len(index.find_by_name('CN=Root,C=WN')) == 2
+    assert not index.get(b'\x01').is_valid(now.replace(tzinfo=None))
+    index.rollback()
+
+    assert index.get(b'\x02') is None and index.find_by_public_key(b'k2') == []
+    assert index.find_by_name('CN=Root,C=WN') == [root] and root.revocated_at is None
+
+    index.begin()
+    index.revoke(b'\x01', now)
+    index.commit()
+    index.rollback()
+    assert root.revocated_at == now.replace(tzinfo=None)
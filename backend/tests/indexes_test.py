@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timedelta
+
+
+def explain(connection, select_stmt, **params) -> str:
+    """ Details of SQLite query plan of statement """
+    compiled = select_stmt.compile(dialect=connection.dialect)
+    values = compiled.construct_params(params)
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled),
+                                      tuple(values[name] for name in compiled.positiontup)).all()
+    return '\n'.join(row[-1] for row in rows)
+
+
+def test_lookups_use_covering_indexes(make_database):
+    from dpki.chain import SELECT_LATEST, query
+    with make_database().connect() as connection:
+        plan = explain(connection, query._SELECT_VALID_BY_NAME, name='', at='')
+        assert 'USING COVERING INDEX ix_cert_entities_valid_by_name (name=? AND not_valid_after>?)' in plan
+        plan = explain(connection, query._SELECT_LIVE_BY_PUBLIC_KEY, public_key=b'', at='')
+        assert 'USING COVERING INDEX ix_cert_entities_live_by_public_key (public_key=? AND not_valid_after>?)' in plan
+        plan = explain(connection, query._SELECT_REVOKED_SINCE, since='')
+        assert 'USING COVERING INDEX ix_cert_entities_revoked (revocated_at>?)' in plan
+        plan = explain(connection, SELECT_LATEST)
+        assert plan == 'SCAN app_state USING COVERING INDEX ix_app_state_latest'
+
+
+def test_lookups(make_database):
+    from dpki import database
+    from dpki.chain import Application
+    engine = make_database()
+    now = datetime(2030, 1, 1)
+    rows = [dict(sn=bytes([index]), name='CN=Alice,C=WN', public_key=b'key', der_serialized=b'',
+                 not_valid_before=now - timedelta(days=10), not_valid_after=now + timedelta(days=days),
+                 revocated_at=revocated_at)
+            for index, (days, revocated_at) in enumerate([(10, None), (-5, None), (10, now - timedelta(days=1)),
+                                                          (10, now - timedelta(days=3))])]
+    with engine.begin() as connection:
+        connection.execute(database.cert_entities.insert(), rows)
+        connection.execute(database.app_state.insert(), [dict(created_at=now, block_height=5, app_hash=b'')])
+
+    async def run():
+        app = Application()
+        assert await app.queries.find_valid('CN=Alice,C=WN', now) == (5, [b'\x00'])
+        assert await app.queries.find_valid('CN=Bob,C=WN', now) == (5, [])
+        assert await app.queries.find_live(b'key', now - timedelta(days=6)) == (5, [b'\x01', b'\x00'])
+        assert await app.queries.revoked_since(now - timedelta(days=2)) == (5, [(b'\x02', now - timedelta(days=1))])
+        height, revoked = await app.queries.revoked_since(now - timedelta(days=5))
+        assert [sn for sn, _ in revoked] == [b'\x03', b'\x02']
+        await app.close()
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def test_mempool_filter(genesis_app, root_ca):
+    from dpki.chain import tx as txs
+    from dpki.chain.tx import TxCode
+    from dpki.chain.validator import TX_SIGNER_OPTS
+    provider = CSProvider()
+    root, key = root_ca
+    alice_key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Alice, C=WN', alice_key, x509cert.template.User)
+    alice = x509cert.apply_csr(csr, (root, key), '2050-01-01', '2020-01-01')
+    sn = txs.serial_to_sn(alice.serial_number)
+    issue = txs.encode_issue(alice)
+    issue_json = json.dumps(dict(op='issue', certificate=alice.public_bytes(
+        encoding=serialization.Encoding.PEM).decode('utf8'))).encode('utf8')
+    revoke = txs.encode_revoke(sn, provider.sign(alice_key, txs.revoke_message(sn), TX_SIGNER_OPTS))
+    revoke_by_issuer = txs.encode_revoke(sn, provider.sign(key, txs.revoke_message(sn), TX_SIGNER_OPTS))
+
+    async def check(app, data):
+        return (await app.checker.check_tx(SimpleNamespace(tx=data))).code
+
+    async def run():
+        app = await genesis_app([root])
+        await app.keeper.end_transaction()
+
+        assert await check(app, issue) == TxCode.OK
+        assert await check(app, issue) == TxCode.Duplicate
+        assert await check(app, issue_json) == TxCode.AlreadyExists
+
+        header = SimpleNamespace(height=1, time=datetime.now(timezone.utc))
+        await app.keeper.begin_block(SimpleNamespace(header=header))
+        assert (await app.keeper.deliver_tx(SimpleNamespace(tx=issue))).code == TxCode.OK
+        await app.keeper.end_block(SimpleNamespace(height=1))
+        await app.keeper.commit(SimpleNamespace())
+
+        assert await check(app, issue) == TxCode.Duplicate
+        assert await check(app, revoke) == TxCode.OK
+        assert await check(app, revoke_by_issuer) == TxCode.AlreadyRevoked
+        # Block without the revocation is committed, it is rechecked
+        await app.keeper.begin_block(SimpleNamespace(header=header))
+        await app.keeper.end_block(SimpleNamespace(height=2))
+        await app.keeper.commit(SimpleNamespace())
+        assert await check(app, revoke) == TxCode.OK
+        await app.close()
+
+    asyncio.run(run())
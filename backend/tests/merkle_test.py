@@ -0,0 +1,64 @@
+import random
+
+from csp import sha256
+from csp.merkle import EMPTY, SparseMerkleTree, verify_proof
+
+
+def make_tree(items):
+    tree = SparseMerkleTree()
+    for key, value in items:
+        tree.update(key, value)
+    return tree
+
+
+def test_root_is_canonical():
+    items = [(i.to_bytes(20, 'big'), sha256.digest(i.to_bytes(2, 'big'))) for i in range(300)]
+    tree = make_tree(items)
+    shuffled = items[:]
+    random.Random(1).shuffle(shuffled)
+    assert make_tree(shuffled).sum() == tree.sum() != EMPTY
+    assert len(tree) == 300
+
+    root = tree.sum()
+    tree.update(b'extra', sha256.digest(b'extra'))
+    tree.update(items[0][0], sha256.digest(b'changed'))
+    tree.remove(b'extra')
+    tree.update(items[0][0], items[0][1])
+    assert tree.sum() == root and len(tree) == 300
+
+    for key, _ in items:
+        tree.remove(key)
+    assert tree.sum() == EMPTY and len(tree) == 0
+
+
+def test_proofs():
+    items = [(i.to_bytes(20, 'big'), sha256.digest(i.to_bytes(2, 'big'))) for i in range(100)]
+    tree = make_tree(items)
+    root = tree.sum()
+    for key, value in items[::7]:
+        proof = tree.prove(key)
+        assert verify_proof(root, key, value, proof)
+        assert not verify_proof(root, key, sha256.digest(b'other'), proof)
+        assert not verify_proof(root, key, None, proof)
+    for key in (b'absent', b'missing', b'not here'):
+        proof = tree.prove(key)
+        assert verify_proof(root, key, None, proof)
+        assert not verify_proof(root, key, sha256.digest(b'other'), proof)
+    assert verify_proof(EMPTY, b'key', None, SparseMerkleTree().prove(b'key'))
+    single = make_tree(items[:1])
+    assert verify_proof(single.sum(), *items[0], single.prove(items[0][0]))
+
+
+def test_rollback():
+    tree = make_tree([(b'a', sha256.digest(b'a'))])
+    root = tree.sum()
+    tree.begin()
+    tree.update(b'b', sha256.digest(b'b'))
+    tree.remove(b'a')
+    tree.rollback()
+    assert tree.sum() == root and tree.get(b'a') == sha256.digest(b'a') and tree.get(b'b') is None
+    tree.begin()
+    tree.update(b'b', sha256.digest(b'b'))
+    tree.commit()
+    tree.rollback()
+    assert tree.get(b'b') == sha256.digest(b'b')
@@ -0,0 +1,47 @@
+import asyncio
+
+
+def test_render():
+    from dpki import metrics
+    registry = metrics.Registry()
+    latency = registry.histogram('test_seconds', 'Latency', ('handler',), buckets=(.1, 1.0))
+    txs = registry.counter('test_txs', 'Transactions')
+    series = latency.labels('commit')
+    for value in (.05, .5, .5, 3):
+        series.observe(value)
+    txs.inc(2)
+    assert registry.render().splitlines() == [
+        '# HELP test_seconds Latency',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{handler="commit",le="0.1"} 1',
+        'test_seconds_bucket{handler="commit",le="1"} 3',
+        'test_seconds_bucket{handler="commit",le="+Inf"} 4',
+        'test_seconds_sum{handler="commit"} 4.05',
+        'test_seconds_count{handler="commit"} 4',
+        '# HELP test_txs Transactions',
+        '# TYPE test_txs counter',
+        'test_txs_total 2',
+    ]
+
+
+def test_serve():
+    from dpki import metrics
+
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('ascii'))
+        data = await reader.read()
+        writer.close()
+        return data
+
+    async def run():
+        metrics.CRYPTO_SECONDS.labels('verify').observe(.001)
+        server = await metrics.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        status, _, body = (await get(port, '/metrics')).partition(b'\r\n\r\n')
+        assert status.startswith(b'HTTP/1.1 200') and b'dpki_crypto_seconds_count{op="verify"}' in body
+        assert (await get(port, '/')).startswith(b'HTTP/1.1 404')
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
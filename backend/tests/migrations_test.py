@@ -0,0 +1,52 @@
+import os
+
+import sqlalchemy as sa
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+SCRIPT_LOCATION = os.path.join(os.path.dirname(__file__), '..', '..', 'alembic')
+
+
+def test_der_serialized_migration(monkeypatch, tmp_path):
+    from alembic import command
+    from alembic.config import Config
+    from dpki import database
+    monkeypatch.setenv('DATABASE_URL', f'sqlite+aiosqlite:///{os.path.join(tmp_path, "database.db")}')
+    config = Config()
+    config.set_main_option('script_location', SCRIPT_LOCATION)
+    engine = database.engine_factory(sync=True)
+
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Wonderland root CA, C=WN', key, x509cert.template.CA)
+    certs = [x509cert.apply_csr(csr, (csr, key), '2070-01-01', '2020-01-01')]
+    certs += [x509cert.apply_csr(x509cert.create_csr(f'CN=user{index}, C=WN', provider.key_gen(ed25519.KeyOpts()),
+                                                     x509cert.template.User), (certs[0], key), '2050-01-01')
+              for index in range(3)]
+    rows = [dict(sn=cert.serial_number.to_bytes(20, 'big'), name=cert.subject.rfc4514_string(),
+                 public_key=bytes(provider.key_import(cert.public_key())),
+                 pem_serialized=cert.public_bytes(serialization.Encoding.PEM).decode('utf8'),
+                 not_valid_after=cert.not_valid_after, not_valid_before=cert.not_valid_before) for cert in certs]
+    ders = {row['sn']: cert.public_bytes(serialization.Encoding.DER) for row, cert in zip(rows, certs)}
+
+    def select(*columns):
+        table = sa.Table('cert_entities', sa.MetaData(), autoload_with=engine)
+        with engine.connect() as connection:
+            result = connection.execute(sa.select(table.c.sn, *(table.c[column] for column in columns))).all()
+        return {row[0]: tuple(row[1:]) for row in result}
+
+    # Rows are written by schema preceding the migration
+    command.upgrade(config, '000000000100')
+    with engine.begin() as connection:
+        connection.execute(sa.Table('cert_entities', sa.MetaData(), autoload_with=engine).insert(), rows)
+
+    command.upgrade(config, '000000000200')
+    assert select('der_serialized', 'pem_serialized') == {sn: (der, None) for sn, der in ders.items()}
+
+    command.downgrade(config, '000000000100')
+    assert 'der_serialized' not in [column['name'] for column in sa.inspect(engine).get_columns('cert_entities')]
+    assert select('pem_serialized') == {row['sn']: (row['pem_serialized'],) for row in rows}
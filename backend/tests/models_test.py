@@ -0,0 +1,42 @@
+from datetime import timezone
+
+from cryptography.hazmat.primitives import serialization
+from sqlalchemy import create_engine
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def test_cert_entity(monkeypatch):
+    from cryptography import x509
+    from dpki import database
+    from dpki.models import CertEntity
+
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Wonderland root CA, C=WN', key, x509cert.template.CA)
+    cert = x509cert.apply_csr(csr, (csr, key), '2070-01-01', '2020-01-01')
+    entity = CertEntity.from_certificate(cert, bytes(provider.key_import(cert.public_key())))
+    assert not hasattr(entity, '__dict__')
+
+    engine = create_engine('sqlite://')
+    database.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(database.cert_entities.insert(), [entity.to_row()])
+        row = connection.execute(database.cert_entities.select()).one()
+    restored = CertEntity.from_row(row)
+    assert restored.to_row() == dict(entity.to_row(), not_valid_after=entity.not_valid_after.replace(tzinfo=None),
+                                     not_valid_before=entity.not_valid_before.replace(tzinfo=None))
+    assert restored.not_valid_after.replace(tzinfo=timezone.utc) == entity.not_valid_after
+
+    # Certificate is parsed on the first access only
+    loaded = []
+    load = x509.load_der_x509_certificate
+    monkeypatch.setattr(x509, 'load_der_x509_certificate', lambda data: loaded.append(data) or load(data))
+    assert restored._certificate is None
+    assert restored.certificate == cert and restored.certificate is restored.certificate
+    assert loaded == [entity.der_serialized]
+    assert restored.to_pem() == cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+    assert len(loaded) == 1
@@ -0,0 +1,33 @@
+import pytest
+
+from dpki.x509cert import names
+from dpki.x509cert.names import DistinguishedName, Hierarchy
+
+
+def test_deserialize_cache():
+    name = DistinguishedName.deserialize('CN=Alice, O=Wonderland, C=WN')
+    assert DistinguishedName.deserialize('CN=Alice, O=Wonderland, C=WN') is name
+    assert DistinguishedName.deserialize('cn=Alice,o=Wonderland,c=WN') is name
+    assert name.rfc4514_string() == 'CN=Alice,O=Wonderland,C=WN'
+    assert DistinguishedName('CN=Alice, O=Wonderland, C=WN') == name
+    assert DistinguishedName('CN=Alice, O=Wonderland, C=WN').raw == name.raw
+    with pytest.raises(ValueError):
+        DistinguishedName.deserialize('CN=Alice')
+
+    cache_size, names.CACHE_SIZE = names.CACHE_SIZE, 4
+    try:
+        for index in range(5):
+            DistinguishedName.deserialize(f'CN=User{index}, C=WN')
+        assert len(names._cache) <= 4
+        assert DistinguishedName.deserialize('CN=Alice, O=Wonderland, C=WN') is not name
+    finally:
+        names.CACHE_SIZE = cache_size
+
+
+def test_select():
+    name = DistinguishedName.deserialize('UID=alice, DC=wonderland, DC=wn')
+    domain = name.select(Hierarchy.Domain)
+    assert domain is name.select(Hierarchy.Domain)
+    assert domain.rfc4514_string() == 'UID=alice,DC=wonderland,DC=wn'
+    assert name.select(Hierarchy.Country) is None
+    assert DistinguishedName.deserialize('CN=Alice, L=Tea party, C=WN').select(Hierarchy.Country) is not None
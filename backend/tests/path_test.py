@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from cryptography import x509
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+NOW = datetime(2030, 1, 1)
+
+
+def test_path_cache(genesis_app, issue, register):
+    from dpki.chain.tx import TxCode, TxError
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA, path_length=1)
+    intermediate = issue('CN=Intermediate CA, C=WN', root, x509cert.template.CA)
+    leaves = [issue(f'CN=user{index}, C=WN', intermediate)[0] for index in range(3)]
+    sub_ca = issue('CN=Sub CA, C=WN', intermediate, x509cert.template.CA)
+
+    async def run():
+        app = await genesis_app([root[0]])
+        intermediate_record = register(app, intermediate[0])
+        verified = []
+        verify = app.csp.verify
+        app.csp.verify = lambda *args: verified.append(args) or verify(*args)
+
+        assert await app.paths.validate(leaves[0], NOW) == intermediate_record.sn
+        assert len(verified) == 2
+        for leaf in leaves[1:]:
+            await app.paths.validate(leaf, NOW)
+        assert len(verified) == 4
+
+        # CA below intermediate exceeds path length of root
+        await app.paths.validate(sub_ca[0], NOW)
+        register(app, sub_ca[0])
+        with pytest.raises(TxError) as exc_info:
+            await app.paths.validate(issue('CN=user, C=WN', sub_ca)[0], NOW)
+        assert exc_info.value.code == TxCode.InvalidIssuer
+
+        app.index.revoke(intermediate_record.sn, NOW)
+        app.paths.invalidate(intermediate_record.sn)
+        with pytest.raises(TxError) as exc_info:
+            await app.paths.validate(leaves[0], NOW)
+        assert exc_info.value.code == TxCode.InvalidIssuer
+        await app.close()
+
+    asyncio.run(run())
+
+
+def test_usage_checked(issue):
+    from dpki.chain.path import check_usage
+    from dpki.chain.tx import TxError
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    check_usage(root[0])
+    check_usage(issue('CN=node, C=WN', root, x509cert.template.Node)[0])
+    key = CSProvider().key_gen(ed25519.KeyOpts())
+    csr = x509.CertificateSigningRequestBuilder().subject_name(x509.Name.from_rfc4514_string('CN=bare,C=WN')) \
+        .sign(private_key=key.raw, algorithm=None)
+    with pytest.raises(TxError):
+        check_usage(x509cert.apply_csr(csr, root, '2050-01-01'))
+
+
+def test_uncommitted_certificates(genesis_app, issue):
+    from dpki.chain import tx as txs
+    from dpki.chain.path import PathValidator
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    cas = [issue(f'CN=CA {index}, C=WN', root, x509cert.template.CA) for index in range(3)]
+
+    async def run():
+        app = await genesis_app([root[0]])
+        await app.keeper.end_transaction()
+        app.paths = PathValidator(app, cache_size=1)
+        header = SimpleNamespace(height=1, time=datetime.now(timezone.utc))
+        await app.keeper.begin_block(SimpleNamespace(header=header))
+        # CAs of one block outnumber cache, certificates of them are not evicted till commit
+        for cert in [ca[0] for ca in cas] + [issue('CN=user, C=WN', ca)[0] for ca in cas]:
+            resp = await app.keeper.deliver_tx(SimpleNamespace(tx=txs.encode_issue(cert)))
+            assert resp.code == 0, resp.log
+        await app.keeper.end_block(SimpleNamespace(height=1))
+        await app.keeper.commit(SimpleNamespace())
+        assert len(app.paths.certificates) == 1
+
+        # Evicted CAs are read from database
+        app.paths.clear()
+        for ca in cas:
+            resp = await app.checker.check_tx(SimpleNamespace(tx=txs.encode_issue(issue('CN=user, C=WN', ca)[0])))
+            assert resp.code == 0, resp.log
+        await app.close()
+
+    asyncio.run(run())
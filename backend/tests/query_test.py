@@ -0,0 +1,53 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def test_query_sees_committed_height(genesis_app, root_ca):
+    from dpki.chain import tx as txs
+    root, _ = root_ca
+    user_csr = x509cert.create_csr('CN=Alice, C=WN', CSProvider().key_gen(ed25519.KeyOpts()), x509cert.template.User)
+    user = x509cert.apply_csr(user_csr, root_ca, '2050-01-01', '2020-01-01')
+
+    async def query(app, path, data):
+        resp = await app.query(SimpleNamespace(path=path, data=data))
+        return resp.height, json.loads(resp.value) if resp.value else None
+
+    async def run():
+        app = await genesis_app([root])
+        genesis_height = app.keeper.block_height
+        await app.keeper.end_transaction()
+        # Certificate is not found before the first commit, this result is not cached
+        root_sn = root.serial_number.to_bytes(20, 'big')
+        resp = await app.query(SimpleNamespace(path='/cert/sn', data=root_sn))
+        assert resp.code == txs.TxCode.NotFound and root_sn not in app.queries.cache
+        await app.keeper.begin_transaction()
+        app.keeper.buffer.set_app_state(genesis_height, app.tree.sum(), datetime.now(timezone.utc))
+        await app.keeper.end_transaction()
+        app.reset_committed(genesis_height)
+
+        header = SimpleNamespace(height=genesis_height + 1, time=datetime.now(timezone.utc))
+        await app.keeper.begin_block(SimpleNamespace(header=header))
+        resp = await app.keeper.deliver_tx(SimpleNamespace(tx=txs.encode_issue(user)))
+        assert resp.code == 0, resp.log
+        # Certificate of block being delivered is in index, but it is not committed yet
+        assert await query(app, '/cert/name', b'CN=Alice,C=WN') == (genesis_height, [])
+        height, (status,) = await query(app, '/cert/name', b'CN=Wonderland root CA,C=WN')
+        assert height == genesis_height and status['valid']
+        for path in ('/cert/name', '/cert/valid'):
+            resp = await app.query(SimpleNamespace(path=path, data=b'\xff\xfe'))
+            assert resp.code == txs.TxCode.BadEncoding, path
+
+        await app.keeper.end_block(SimpleNamespace(height=genesis_height + 1))
+        await app.keeper.commit(SimpleNamespace())
+        height, (status,) = await query(app, '/cert/name', b'CN=Alice,C=WN')
+        assert height == genesis_height + 1 and status['name'] == 'CN=Alice,C=WN'
+        await app.close()
+
+    asyncio.run(run())
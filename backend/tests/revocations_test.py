@@ -0,0 +1,31 @@
+import pytest
+
+
+def sn(value: int) -> bytes:
+    return value.to_bytes(20, 'big')
+
+
+def test_revocation_lists():
+    from dpki.chain.revocations import ListKind, RevocationList, RevocationSet
+    revocations = RevocationSet(log_size=3)
+    revocations.reset([sn(5), sn(1)], 10)
+    revocations.add_block(11, [sn(3)])
+    revocations.add_block(12, [])
+    revocations.add_block(13, [sn(9), sn(0), sn(3)])
+
+    assert len(revocations) == 5 and sn(9) in revocations and sn(2) not in revocations
+    assert list(revocations) == [sn(0), sn(1), sn(3), sn(5), sn(9)]
+
+    full = RevocationList.decode(revocations.full(11).encode())
+    assert full.kind == ListKind.Full and full.height == 11
+    assert full.serials == (sn(1), sn(3), sn(5))
+    delta = RevocationList.decode(revocations.delta(11).encode())
+    assert delta.kind == ListKind.Delta and (delta.base_height, delta.height) == (11, 13)
+    assert delta.serials == (sn(0), sn(9))
+    assert sorted(full.serials + delta.serials) == list(revocations.full().serials)
+
+    revocations.add_block(14, [sn(7)])
+    revocations.add_block(15, [sn(8)])
+    with pytest.raises(ValueError):
+        revocations.delta(10)
+    assert revocations.delta(11).serials == (sn(0), sn(7), sn(8), sn(9))
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def make_certs(root_ca, count):
+    provider = CSProvider()
+    csrs = [x509cert.create_csr(f'CN=user{index}, O=Wonderland, C=WN', provider.key_gen(ed25519.KeyOpts()),
+                                x509cert.template.User) for index in range(count)]
+    return [root_ca[0], *x509cert.apply_csrs(csrs, root_ca, '2050-01-01')]
+
+
+def use_snapshots(app, path):
+    app.snapshots.path = os.path.join(path, 'snapshots')
+    app.snapshots.chunk_size = 2048
+    return app
+
+
+def test_snapshot_restore(genesis_app, make_database, root_ca, tmp_path):
+    from dpki.chain import Application
+    from dpki.chain.snapshots import ApplyResult, OfferResult
+
+    async def run():
+        source = use_snapshots(await genesis_app(make_certs(root_ca, 20), 'source.db'), tmp_path)
+        source.keeper.buffer.set_app_state(1, source.tree.sum(), datetime.now(timezone.utc))
+        await source.keeper.end_transaction()
+        await source.snapshots.take(1)
+        snapshot, = (await source.list_snapshots(None)).snapshots
+        assert snapshot.height == 1 and snapshot.chunks > 1
+
+        make_database('target.db')
+        target = use_snapshots(Application(), tmp_path)
+        resp = await target.offer_snapshot(SimpleNamespace(snapshot=snapshot, app_hash=source.tree.sum()))
+        assert resp.result == OfferResult.Accept
+        for index in range(snapshot.chunks):
+            chunk = (await source.load_snapshot_chunk(SimpleNamespace(height=1, format=snapshot.format,
+                                                                      chunk=index))).chunk
+            if index == 0:
+                resp = await target.apply_snapshot_chunk(SimpleNamespace(index=0, chunk=chunk[:-1], sender='peer'))
+                assert resp.result == ApplyResult.Retry and resp.refetch_chunks == [0]
+            resp = await target.apply_snapshot_chunk(SimpleNamespace(index=index, chunk=chunk, sender='peer'))
+            assert resp.result == ApplyResult.Accept
+        assert target.state.block_height == 1 and target.tree.sum() == source.tree.sum()
+        assert len(target.index) == 21
+        await source.close()
+        await target.close()
+
+    asyncio.run(run())
+
+
+def test_forged_snapshot_is_rejected(genesis_app, make_database, root_ca, tmp_path):
+    import zlib
+    import csp.sha256
+    from dpki import database
+    from dpki.chain import Application
+    from dpki.chain.snapshots import FORMAT, KIND_APP_STATE, ApplyResult, OfferResult, Snapshot, pack_record
+
+    async def run():
+        source = await genesis_app(make_certs(root_ca, 3), 'source.db')
+        source.keeper.buffer.set_app_state(7, source.tree.sum(), datetime.now(timezone.utc))
+        await source.keeper.end_transaction()
+        app_hash = source.tree.sum()
+        await source.close()
+
+        # Trusted app state row without certificates
+        chunk = zlib.compress(pack_record(KIND_APP_STATE, (datetime.now(timezone.utc), 7, app_hash)))
+        hashes = [csp.sha256.digest(chunk)]
+        snapshot = Snapshot(height=7, format=FORMAT, chunks=1, hash=csp.sha256.digest(b''.join(hashes)),
+                            metadata=json.dumps([item.hex() for item in hashes]).encode('ascii'))
+        make_database('target.db')
+        target = use_snapshots(Application(), tmp_path)
+        resp = await target.offer_snapshot(SimpleNamespace(snapshot=snapshot, app_hash=app_hash))
+        assert resp.result == OfferResult.Accept
+        resp = await target.apply_snapshot_chunk(SimpleNamespace(index=0, chunk=chunk, sender='peer'))
+        assert resp.result == ApplyResult.RejectSnapshot
+        async with target.reader.connect() as connection:
+            assert not (await connection.execute(database.app_state.select())).all()
+        assert target.snapshots.restore is None and len(target.index) == 0
+        await target.close()
+
+    asyncio.run(run())
+
+
+def test_snapshot_is_taken_in_background_at_committed_height(genesis_app, make_database, root_ca, tmp_path):
+    from dpki.chain import Application
+    from dpki.chain.snapshots import ApplyResult
+
+    async def run():
+        source = use_snapshots(await genesis_app(make_certs(root_ca, 5), 'source.db'), tmp_path)
+        source.snapshots.interval = 1
+        source.keeper.buffer.set_app_state(1, source.tree.sum(), datetime.now(timezone.utc))
+        await source.keeper.end_transaction()
+        app_hash = source.tree.sum()
+        await source.snapshots.commit(1)
+        assert not source.snapshots.taking.done()
+        # Block committed while snapshot is being taken is not in snapshot
+        source.keeper.buffer.set_app_state(2, b'\0' * 32, datetime.now(timezone.utc))
+        await source.keeper.begin_transaction()
+        await source.keeper.end_transaction()
+        await source.snapshots.taking
+        snapshot, = (await source.list_snapshots(None)).snapshots
+        assert snapshot.height == 1
+
+        make_database('target.db')
+        target = use_snapshots(Application(), tmp_path)
+        await target.offer_snapshot(SimpleNamespace(snapshot=snapshot, app_hash=app_hash))
+        for index in range(snapshot.chunks):
+            chunk = (await source.load_snapshot_chunk(SimpleNamespace(height=1, format=snapshot.format,
+                                                                      chunk=index))).chunk
+            resp = await target.apply_snapshot_chunk(SimpleNamespace(index=index, chunk=chunk, sender='peer'))
+            assert resp.result == ApplyResult.Accept
+        assert target.state.block_height == 1 and target.tree.sum() == app_hash
+        await source.close()
+        await target.close()
+
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_restart(genesis_app, root_ca):
+    from dpki.chain import Application
+
+    async def run():
+        app = await genesis_app([root_ca[0]])
+        for height in (1, 2):
+            app.keeper.buffer.set_app_state(height, app.tree.sum(), datetime.now(timezone.utc))
+        await app.keeper.end_transaction()
+        app_hash = app.tree.sum()
+        await app.close()
+
+        app = Application()
+        state = await app.get_initial_app_state()
+        assert (state.block_height, state.app_hash) == (2, app_hash)
+        assert 'validator' not in vars(app) and 'queries' not in vars(app)
+        # Query waits for index to be loaded
+        resp = await app.query(SimpleNamespace(path='/cert/name', data=b'CN=Wonderland root CA,C=WN'))
+        assert resp.height == 2 and len(json.loads(resp.value)) == 1
+        assert app.tree.sum() == app_hash
+        await app.close()
+
+        # Application does not become ready if state does not match the latest app hash
+        app = Application()
+        app.keeper.buffer.set_app_state(3, b'\0' * 32, datetime.now(timezone.utc))
+        await app.keeper.begin_transaction()
+        await app.keeper.end_transaction()
+        await app.close()
+        app = Application()
+        await app.get_initial_app_state()
+        with pytest.raises(RuntimeError):
+            await app.ready()
+        await app.close()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def test_encoding():
+    from dpki.chain import tx as txs
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Wonderland root CA, C=WN', key, x509cert.template.CA)
+    cert = x509cert.apply_csr(csr, (csr, key), '2070-01-01')
+    der_serialized = cert.public_bytes(encoding=serialization.Encoding.DER)
+
+    data = txs.encode_issue(cert)
+    assert len(data) == 4 + len(der_serialized)
+    tx = txs.decode(data)
+    assert isinstance(tx, txs.IssueTx) and tx.der_serialized == der_serialized and tx.certificate == cert
+
+    tx = txs.decode(txs.encode_revoke(tx.sn, bytes(64)))
+    assert isinstance(tx, txs.RevokeTx) and tx.sn == txs.serial_to_sn(cert.serial_number)
+    assert tx.signature == bytes(64)
+
+    pem_serialized = cert.public_bytes(encoding=serialization.Encoding.PEM).decode('utf8')
+    tx = txs.decode(json.dumps(dict(op='issue', certificate=pem_serialized)).encode('utf8'))
+    assert tx.der_serialized == der_serialized
+
+    for data, code in ((data[:-1], txs.TxCode.BadEncoding), (b'\x02' + data[1:], txs.TxCode.BadEncoding),
+                       (b'\x01\x07', txs.TxCode.UnknownOperation),
+                       (b'\x01\x01\x00\x01\x00', txs.TxCode.BadCertificate)):
+        with pytest.raises(txs.TxError) as exc_info:
+            txs.decode(data)
+        assert exc_info.value.code == code
+
+
+def test_malformed():
+    from dpki.chain import tx as txs
+    sn = bytes(range(20))
+    data = txs.encode_revoke(sn, bytes(64))
+    tx = txs.decode(data)
+    assert (tx.sn, tx.signature, tx.hash) == (sn, bytes(64), txs.decode(data).hash)
+    for data, code in ((b'', txs.TxCode.BadEncoding), (b'\x01', txs.TxCode.BadEncoding),
+                       (data[:-1], txs.TxCode.BadEncoding), (data[:23], txs.TxCode.BadEncoding),
+                       (txs._pack(txs.TxOp.Revoke, sn), txs.TxCode.BadEncoding),
+                       (txs._pack(txs.TxOp.Issue), txs.TxCode.BadEncoding),
+                       (b'{', txs.TxCode.BadEncoding), (b'{"sn": "00"}', txs.TxCode.BadEncoding),
+                       (b'{"op": "burn"}', txs.TxCode.UnknownOperation),
+                       (b'{"op": "issue", "certificate": "garbage"}', txs.TxCode.BadCertificate),
+                       (b'{"op": "revoke", "sn": "zz", "signature": ""}', txs.TxCode.BadEncoding),
+                       (b'{"op": "revoke", "sn": "00", "signature": "!"}', txs.TxCode.BadEncoding)):
+        with pytest.raises(txs.TxError) as exc_info:
+            txs.decode(data)
+        assert exc_info.value.code == code, data
@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import dpki.x509cert.template
+from dpki import x509cert
+
+NOW = datetime(2030, 1, 1)
+
+
+def revoke(app, cert, key):
+    from dpki.chain import tx as txs
+    from dpki.chain.validator import TX_SIGNER_OPTS
+    sn = txs.serial_to_sn(cert.serial_number)
+    return txs.decode(txs.encode_revoke(sn, app.csp.sign(key, txs.revoke_message(sn), TX_SIGNER_OPTS)))
+
+
+async def code(validator, tx, now=NOW):
+    from dpki.chain.tx import TxError
+    with pytest.raises(TxError) as exc_info:
+        await validator.validate(tx, now)
+    assert tx.hash not in validator.verified
+    return exc_info.value.code
+
+
+def test_validate(genesis_app, issue, register):
+    from dpki.chain import tx as txs
+    from dpki.chain.tx import TxCode
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    forged_root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    unknown_root = issue('CN=Unknown CA, C=WN', None, x509cert.template.CA)
+    alice = issue('CN=Alice, C=WN', root)
+    registered = issue('CN=Bob, C=WN', root)
+
+    async def run():
+        app = await genesis_app([root[0]])
+        validator = app.validator
+        root_record, = app.index.find_by_name('CN=Root CA,C=WN')
+        register(app, registered[0])
+        decode = validator.decode
+
+        await validator.validate(decode(txs.encode_issue(alice[0])), NOW)
+        verified = validator.verified.get(txs.decode(txs.encode_issue(alice[0])).hash)
+        assert verified.signatures == {root_record.sn: True}
+        assert await code(validator, decode(txs.encode_issue(registered[0]))) == TxCode.AlreadyExists
+        assert await code(validator, decode(txs.encode_issue(root[0]))) == TxCode.InvalidIssuer
+        carol = issue('CN=Carol, C=WN', unknown_root)[0]
+        assert await code(validator, decode(txs.encode_issue(carol))) == TxCode.UnknownIssuer
+        carol = issue('CN=Carol, C=WN', forged_root)[0]
+        assert await code(validator, decode(txs.encode_issue(carol))) == TxCode.BadSignature
+        expired = issue('CN=Carol, C=WN', root, not_valid_after='2025-01-01')[0]
+        assert await code(validator, decode(txs.encode_issue(expired))) == TxCode.Expired
+
+        await validator.validate(revoke(app, *registered), NOW)
+        await validator.validate(revoke(app, registered[0], root[1]), NOW)
+        assert await code(validator, revoke(app, registered[0], forged_root[1])) == TxCode.BadSignature
+        assert await code(validator, revoke(app, alice[0], alice[1])) == TxCode.NotFound
+        app.keeper.block_time = NOW
+        app.keeper.apply_tx(revoke(app, *registered))
+        assert await code(validator, revoke(app, *registered)) == TxCode.AlreadyRevoked
+        await app.close()
+
+    asyncio.run(run())
+
+
+def test_verified_cache(genesis_app, issue, register):
+    from dpki.chain import tx as txs
+    from dpki.chain.tx import TxCode
+    from dpki.chain.validator import TxValidator
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    forged_root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    users = [issue(f'CN=user{index}, C=WN', root) for index in range(3)]
+
+    async def run():
+        app = await genesis_app([root[0]])
+        validator = app.validator = TxValidator(app, cache_size=2)
+        for user in users:
+            register(app, user[0])
+
+        # Failed verification is not cached, so it fails again and does not let state change make it valid
+        forged = revoke(app, users[0][0], forged_root[1])
+        for _ in range(2):
+            assert await code(validator, forged) == TxCode.BadSignature
+
+        # Verified transaction is dropped from cache when it fails on recheck
+        tx = revoke(app, *users[0])
+        await validator.validate(tx, NOW)
+        assert tx.hash in validator.verified
+        app.keeper.block_time = NOW
+        app.keeper.apply_tx(tx)
+        assert await code(validator, tx) == TxCode.AlreadyRevoked
+
+        others = [revoke(app, *user) for user in users[1:]] + [txs.decode(txs.encode_issue(
+            issue('CN=Dave, C=WN', root)[0]))]
+        for tx in others:
+            await validator.validate(tx, NOW)
+        assert len(validator.verified) == 2 and others[0].hash not in validator.verified
+        assert all(tx.hash in validator.verified for tx in others[1:])
+        assert validator.decode(txs.encode_revoke(others[0].sn, others[0].signature)) is not others[0]
+        await app.close()
+
+    asyncio.run(run())
+
+
+def test_revoke_by_issuer(genesis_app, issue, register):
+    from dpki.chain.tx import TxCode
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    sub_ca = issue('CN=Sub CA, C=WN', root, x509cert.template.CA)
+    impostor = issue('CN=Root CA, C=WN', sub_ca)
+    bob = issue('CN=Bob, C=WN', root)
+
+    async def run():
+        app = await genesis_app([root[0]])
+        for cert, _ in (sub_ca, impostor, bob):
+            register(app, cert)
+
+        # End entity named as root is not issuer of certificates signed by root
+        assert await code(app.validator, revoke(app, bob[0], impostor[1])) == TxCode.BadSignature
+        await app.validator.validate(revoke(app, bob[0], root[1]), NOW)
+        assert await code(app.validator, revoke(app, bob[0], root[1]), datetime(2060, 1, 1)) == TxCode.BadSignature
+        await app.close()
+
+    asyncio.run(run())
+
+
+def test_cache_follows_state(genesis_app, issue, register):
+    from dpki.chain import tx as txs
+    from dpki.chain.validator import TxValidator
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA)
+    cas = [issue('CN=CA, C=WN', root, x509cert.template.CA) for _ in range(2)]
+    tx = txs.decode(txs.encode_issue(issue('CN=Alice, C=WN', cas[0])[0]))
+
+    async def run():
+        app = await genesis_app([root[0]])
+        for ca in cas:
+            register(app, ca[0])
+        await app.validator.validate(tx, NOW)
+
+        # Validator which has checked transaction before gives the same result as a fresh one
+        app.keeper.block_time = NOW
+        app.keeper.apply_tx(revoke(app, *cas[0]))
+        assert await code(app.validator, tx) == await code(TxValidator(app), tx)
+        await app.close()
+
+    asyncio.run(run())
+
+
+def test_check_tx(genesis_app, issue):
+    from dpki.chain import tx as txs
+    from dpki.chain.tx import TxCode
+    root = issue('CN=Root CA, C=WN', None, x509cert.template.CA, '2070-01-01')
+    forged_root = issue('CN=Root CA, C=WN', None, x509cert.template.CA, '2070-01-01')
+    unknown_root = issue('CN=Unknown CA, C=WN', None, x509cert.template.CA, '2070-01-01')
+    alice = issue('CN=Alice, C=WN', root)
+    bob = [issue('CN=Bob, C=WN', issuer_pair, not_valid_after=not_valid_after)[0]
+           for issuer_pair, not_valid_after in ((unknown_root, '2050-01-01'), (forged_root, '2050-01-01'),
+                                                (root, '2024-01-01'))]
+
+    async def run():
+        app = await genesis_app([root[0]])
+        await app.keeper.end_transaction()
+        for data, expected in ((b'\x07', TxCode.BadEncoding),
+                               (txs.encode_issue(bob[0]), TxCode.UnknownIssuer),
+                               (txs.encode_issue(bob[1]), TxCode.BadSignature),
+                               (txs.encode_issue(bob[2]), TxCode.Expired),
+                               (txs.encode_revoke(bytes(20), bytes(64)), TxCode.NotFound),
+                               (txs.encode_issue(alice[0]), TxCode.OK)):
+            resp = await app.checker.check_tx(SimpleNamespace(tx=data))
+            assert resp.code == expected, resp.log
+        await app.close()
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from csp import ed25519
+from csp.provider import CSProvider
+import dpki.x509cert.template
+from dpki import x509cert
+
+
+def make_csrs(provider, count):
+    return [x509cert.create_csr(f'CN=user{index}, O=Wonderland, C=WN', provider.key_gen(ed25519.KeyOpts()),
+                                x509cert.template.User) for index in range(count)]
+
+
+def test_apply_csrs():
+    provider = CSProvider()
+    key = provider.key_gen(ed25519.KeyOpts())
+    csr = x509cert.create_csr('CN=Wonderland root CA, C=WN', key, x509cert.template.CA)
+    issuer_pair = (x509cert.apply_csr(csr, (csr, key), '2070-01-01'), key)
+    csrs = make_csrs(provider, 10)
+    expected = x509cert.apply_csr(csrs[0], issuer_pair, '2050-01-01', '2023-01-01')
+    assert list(expected.extensions) == list(csrs[0].extensions) and len(expected.extensions) > 0
+
+    with ProcessPoolExecutor(2) as executor:
+        for chunk_size in (3, 100):
+            certs = list(x509cert.apply_csrs(csrs, issuer_pair, '2050-01-01', '2023-01-01',
+                                             workers=2, executor=executor, chunk_size=chunk_size))
+            assert [cert.subject for cert in certs] == [csr.subject for csr in csrs]
+            assert len({cert.serial_number for cert in certs}) == len(csrs)
+            for cert in certs:
+                assert cert.issuer == issuer_pair[0].subject
+                assert cert.not_valid_before == expected.not_valid_before
+                assert cert.not_valid_after == expected.not_valid_after
+                assert list(cert.extensions) == list(expected.extensions)
+                cert.verify_directly_issued_by(issuer_pair[0])